@@ -0,0 +1,513 @@
+import ast
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Iterator, cast
+
+from ixp_tracker.json import decode_json, get_json_codec
+
+ARCHIVE_FILE_SUFFIX = ".peeringdb_2_dump.json"
+DELTA_FILE_SUFFIX = ".peeringdb_2_dump.delta.json"
+COMPRESSION_SUFFIXES: dict[str | None, str] = {None: "", "gzip": ".gz", "xz": ".xz"}
+# Normalized copies of the dumps are kept in this directory inside the archive
+NORMALIZED_CACHE_DIR = ".normalized"
+
+
+def get_archive_file_name(
+    archive_path: Path,
+    archive_date: datetime,
+    compression: str | None = None,
+    delta: bool = False,
+) -> Path:
+    return archive_path / (
+        f"{archive_date.year}{archive_date.month:02}{archive_date.day:02}"
+        f"{DELTA_FILE_SUFFIX if delta else ARCHIVE_FILE_SUFFIX}{COMPRESSION_SUFFIXES[compression]}"
+    )
+
+
+def get_compression(file_name: Path) -> str | None:
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if compression is not None and file_name.name.endswith(suffix):
+            return compression
+    return None
+
+
+def is_delta_file(file_name: Path) -> bool:
+    return file_name.name.removesuffix(
+        COMPRESSION_SUFFIXES[get_compression(file_name)]
+    ).endswith(DELTA_FILE_SUFFIX)
+
+
+def find_archive_file(
+    archive_path: Path | None, archive_date: datetime, include_deltas: bool = True
+) -> Path | None:
+    if archive_path is None:
+        return None
+    for delta in [False, True] if include_deltas else [False]:
+        for compression in COMPRESSION_SUFFIXES.keys():
+            file_name = get_archive_file_name(
+                archive_path, archive_date, compression, delta
+            )
+            if file_name.exists():
+                return file_name
+    return None
+
+
+def find_delta_base(
+    archive_path: Path, archive_date: datetime, interval: int
+) -> Path | None:
+    """
+    Returns the most recent full dump saved in the `interval` days before the date, if there is one
+    """
+    for file_date, file_name in reversed(list_archive_files(archive_path)):
+        if file_date.date() >= archive_date.date():
+            continue
+        if (archive_date.date() - file_date.date()).days >= interval:
+            return None
+        if not is_delta_file(file_name):
+            return file_name
+    return None
+
+
+def list_archive_files(archive_path: Path | None) -> list[tuple[datetime, Path]]:
+    if archive_path is None or not archive_path.is_dir():
+        return []
+    archive_files = []
+    for file_name in archive_path.iterdir():
+        archive_date = get_archive_date(file_name)
+        if archive_date is not None:
+            archive_files.append((archive_date, file_name))
+    return sorted(archive_files)
+
+
+def get_archive_date(file_name: Path) -> datetime | None:
+    name = file_name.name
+    suffix = (
+        DELTA_FILE_SUFFIX if is_delta_file(file_name) else ARCHIVE_FILE_SUFFIX
+    ) + COMPRESSION_SUFFIXES[get_compression(file_name)]
+    if not name.endswith(suffix):
+        return None
+    try:
+        return datetime.strptime(name.removesuffix(suffix), "%Y%m%d").replace(
+            tzinfo=timezone.utc
+        )
+    except ValueError:
+        return None
+
+
+def open_archive_file(file_name: Path, mode: str = "rt") -> IO:
+    return open_compressed_file(file_name, mode, get_compression(file_name))
+
+
+def open_compressed_file(file_name: Path, mode: str, compression: str | None) -> IO:
+    encoding = "utf-8" if "t" in mode else None
+    if compression == "gzip":
+        return cast(IO, gzip.open(file_name, mode, encoding=encoding))
+    if compression == "xz":
+        return lzma.open(file_name, mode, encoding=encoding)
+    return open(file_name, mode, encoding=encoding)
+
+
+def compress_archive_file(file_name: Path, compression: str | None) -> Path:
+    """
+    Re-writes an archive file with a different compression. The content itself is copied across unchanged.
+    """
+    archive_date = get_archive_date(file_name)
+    if archive_date is None:
+        raise ValueError(f"{file_name} is not an archive file")
+    if get_compression(file_name) == compression:
+        return file_name
+    new_file_name = get_archive_file_name(
+        file_name.parent, archive_date, compression, is_delta_file(file_name)
+    )
+    partial_file_name = get_partial_file_name(new_file_name)
+    with (
+        open_archive_file(file_name, "rb") as source,
+        open_compressed_file(partial_file_name, "wb", compression) as target,
+    ):
+        shutil.copyfileobj(source, target)
+    os.replace(partial_file_name, new_file_name)
+    os.remove(file_name)
+    return new_file_name
+
+
+def write_archive_file(file_name: Path, data: dict, compression: str | None):
+    partial_file_name = get_partial_file_name(file_name)
+    with open_compressed_file(partial_file_name, "wt", compression) as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(partial_file_name, file_name)
+
+
+def get_partial_file_name(file_name: Path) -> Path:
+    """
+    We write to a temporary file first so an interrupted write never leaves a truncated dump in the archive
+    """
+    return file_name.with_name(f"{file_name.name}.part")
+
+
+class StreamingArchiveReader:
+    """
+    Reads a dump a chunk at a time and only builds Python objects for the records in the collections we ask for.
+    Everything else is scanned over (using regexes so the scanning happens in C) and thrown away, so memory use
+    depends on the size of the collections we keep rather than the size of the dump.
+    """
+
+    chunk_size = 1024 * 1024
+    whitespace = re.compile(r"\s*")
+    structural_characters = re.compile(r'["{}\[\]]')
+    string_end = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+    # The characters that could carry on a number we've decoded, e.g. the "." of "1.5" when "1" ends the buffer
+    number_tail = re.compile(r"[0-9.eE+-]*")
+
+    def __init__(self, f: IO):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def read(self, collections: list[str] | None) -> dict[str, dict[str, list]]:
+        all_data: dict[str, dict[str, list]] = {}
+        self.expect("{")
+        if self.peek() == "'":
+            # We can't stream the dumps that use single quotes, so we bail out early before reading any more
+            raise json.JSONDecodeError("Expecting double quotes", self.buffer, self.pos)
+        if self.peek() == "}":
+            return all_data
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            if collections is None or key in collections:
+                all_data[key] = {"data": self.read_collection()}
+            else:
+                self.skip_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return all_data
+
+    def read_collection(self) -> list:
+        records: list = []
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return records
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            if key == "data":
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        records.append(self.decode_value())
+                        if self.peek() == ",":
+                            self.pos += 1
+                            continue
+                        self.expect("]")
+                        break
+            else:
+                self.skip_value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return records
+
+    def fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        # We drop everything we've already consumed so the buffer never grows much beyond the chunk size
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()  # type: ignore[union-attr]
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, character: str):
+        found = self.peek()
+        if found != character:
+            raise json.JSONDecodeError(
+                f"Expecting '{character}', found '{found}'", self.buffer, self.pos
+            )
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number that runs to the end of the buffer might continue in the next chunk
+                if not isinstance(value, (int, float)) or not self.is_at_end(end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+            if not self.fill():
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+
+    def is_at_end(self, number_end: int) -> bool:
+        tail = self.number_tail.match(self.buffer, number_end)
+        return tail is not None and tail.end() == len(self.buffer)
+
+    def skip_value(self):
+        character = self.peek()
+        if character == '"':
+            self.skip_string()
+        elif character in ["{", "["]:
+            self.skip_container()
+        else:
+            self.decode_value()
+
+    def skip_string(self):
+        while True:
+            match = self.string_end.match(self.buffer, self.pos + 1)
+            if match is not None:
+                self.pos = match.end()
+                return
+            if not self.fill():
+                raise json.JSONDecodeError("Unterminated string", self.buffer, self.pos)
+
+    def skip_container(self):
+        depth = 0
+        while True:
+            match = self.structural_characters.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self.fill():
+                    raise json.JSONDecodeError(
+                        "Unterminated object or array", self.buffer, self.pos
+                    )
+                continue
+            character = match.group()
+            if character == '"':
+                self.pos = match.start()
+                self.skip_string()
+                continue
+            self.pos = match.end()
+            depth += 1 if character in ["{", "["] else -1
+            if depth == 0:
+                return
+
+
+def load_archive_file(file_name: Path, collections: list[str] | None = None) -> dict:
+    """
+    We stream the dump so we only hold the collections we need in memory. A faster codec would decode the whole file in
+    one go, so we only use it to load every collection from an uncompressed file, straight from a memory-mapped file.
+    """
+    if is_delta_file(file_name):
+        return load_delta_file(file_name, collections)
+    try:
+        if (
+            collections is not None
+            or get_compression(file_name) is not None
+            or get_json_codec() == "json"
+        ):
+            with open_archive_file(file_name) as f:
+                return StreamingArchiveReader(f).read(collections)
+        with map_archive_file(file_name) as buffer:
+            all_data = decode_json(buffer)
+    except json.JSONDecodeError:
+        # It seems some of the Peering dumps use single quotes so try and load using ast in this case
+        with open_archive_file(file_name) as f:
+            all_data = ast.literal_eval(f.read())
+    if collections is None:
+        return all_data
+    # We only keep the data for each collection, the same as StreamingArchiveReader
+    return {
+        key: {"data": all_data[key].get("data", [])}
+        for key in collections
+        if key in all_data
+    }
+
+
+def load_delta_file(file_name: Path, collections: list[str] | None = None) -> dict:
+    with map_archive_file(file_name) as buffer:
+        delta = decode_json(buffer)
+    return apply_delta(
+        load_archive_file(find_base_file(file_name, delta), collections),
+        delta,
+        collections,
+    )
+
+
+def find_base_file(file_name: Path, delta: dict) -> Path:
+    base_date = datetime.strptime(delta["base"], "%Y%m%d").replace(tzinfo=timezone.utc)
+    # A delta is always against a full dump, so we never have to follow a chain of deltas
+    base_file_name = find_archive_file(
+        file_name.parent, base_date, include_deltas=False
+    )
+    if base_file_name is None:
+        raise ValueError(f"Cannot find the base dump for {file_name}")
+    return base_file_name
+
+
+def diff_archive_data(base_data: dict, all_data: dict, base_date: datetime) -> dict:
+    """
+    Records what has changed in each collection since the base dump, by object id. Collections that aren't in the base
+    dump, or that have objects without an id, are kept in full.
+    """
+    collections: dict[str, dict] = {}
+    for collection, collection_data in all_data.items():
+        records = collection_data.get("data", [])
+        if collection not in base_data or any("id" not in r for r in records):
+            collections[collection] = {"data": records}
+            continue
+        base_records = {r.get("id"): r for r in base_data[collection].get("data", [])}
+        record_ids = {r["id"] for r in records}
+        collections[collection] = {
+            "upserts": [r for r in records if base_records.get(r["id"]) != r],
+            "deletes": [i for i in base_records.keys() if i not in record_ids],
+        }
+    return {
+        "base": f"{base_date.year}{base_date.month:02}{base_date.day:02}",
+        "collections": collections,
+    }
+
+
+def apply_delta(
+    base_data: dict, delta: dict, collections: list[str] | None = None
+) -> dict:
+    all_data = {}
+    for collection, changes in delta["collections"].items():
+        if collections is not None and collection not in collections:
+            continue
+        if "data" in changes:
+            all_data[collection] = {"data": changes["data"]}
+            continue
+        records = {r["id"]: r for r in base_data.get(collection, {}).get("data", [])}
+        for record_id in changes["deletes"]:
+            records.pop(record_id, None)
+        # Changed objects stay where they were, new objects are added to the end
+        for record in changes["upserts"]:
+            records[record["id"]] = record
+        all_data[collection] = {"data": list(records.values())}
+    return all_data
+
+
+@contextmanager
+def map_archive_file(file_name: Path) -> Iterator[bytes | memoryview]:
+    if get_compression(file_name) is not None:
+        with open_archive_file(file_name, "rb") as f:
+            yield f.read()
+        return
+    with open(file_name, "rb") as f:
+        # We can't map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file,
+            memoryview(mapped_file) as buffer,
+        ):
+            yield buffer
+
+
+def load_normalized_archive_file(
+    file_name: Path, fields: dict[str, list[str] | None]
+) -> dict:
+    """
+    Parsing a dump can be slow, especially the ones we have to load with ast, so the first time we load a dump we keep
+    a compact copy of just the collections and fields we asked for. The copy is keyed by a hash of the dump's content
+    and the fields (and for a delta, which base dump it was applied to), so it's never used if any of them change.
+    Whenever we save a copy we remove the copies of any dump that has since been removed or replaced.
+    """
+    normalized_file_name = get_normalized_file_name(
+        file_name, get_content_hash(file_name, fields)
+    )
+    try:
+        with map_archive_file(normalized_file_name) as buffer:
+            return decode_json(buffer)
+    except (OSError, ValueError):
+        pass
+    all_data = load_archive_file(file_name, list(fields.keys()))
+    normalized_data = {
+        collection: {
+            "data": [
+                normalize_record(record, fields[collection])
+                for record in collection_data.get("data", [])
+            ]
+        }
+        for collection, collection_data in all_data.items()
+    }
+    normalized_file_name.parent.mkdir(exist_ok=True)
+    partial_file_name = get_partial_file_name(normalized_file_name)
+    with open(partial_file_name, "w", encoding="utf-8") as f:
+        json.dump(normalized_data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(partial_file_name, normalized_file_name)
+    prune_normalized_files(normalized_file_name.parent)
+    return normalized_data
+
+
+def prune_normalized_files(normalized_path: Path):
+    for normalized_file_name in normalized_path.iterdir():
+        if normalized_file_name.suffix == ".part":
+            # Another import may still be writing it
+            continue
+        source = get_normalized_source(normalized_file_name)
+        if source is None:
+            normalized_file_name.unlink(missing_ok=True)
+            continue
+        source_file_name, modified = source
+        try:
+            if source_file_name.stat().st_mtime_ns == modified:
+                continue
+        except OSError:
+            pass
+        normalized_file_name.unlink(missing_ok=True)
+
+
+def normalize_record(record: dict, fields: list[str] | None) -> dict:
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def get_normalized_file_name(file_name: Path, content_hash: str) -> Path:
+    # We include when the dump was written so we can tell which copies are for a dump that has gone or been replaced
+    modified = file_name.stat().st_mtime_ns
+    return (
+        file_name.parent
+        / NORMALIZED_CACHE_DIR
+        / f"{file_name.name}.{modified}.{content_hash}.json"
+    )
+
+
+def get_normalized_source(normalized_file_name: Path) -> tuple[Path, int] | None:
+    parts = normalized_file_name.name.rsplit(".", 3)
+    if len(parts) != 4 or parts[3] != "json" or not parts[1].isdigit():
+        return None
+    return normalized_file_name.parent.parent / parts[0], int(parts[1])
+
+
+def get_content_hash(file_name: Path, fields: dict[str, list[str] | None]) -> str:
+    content_hash = hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8"))
+    with open(file_name, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            content_hash.update(chunk)
+    if is_delta_file(file_name):
+        # The same delta gives different data if its base dump is replaced, e.g. by a new download
+        with map_archive_file(file_name) as buffer:
+            base_file_name = find_base_file(file_name, decode_json(buffer))
+        base_stat = base_file_name.stat()
+        content_hash.update(
+            f"{base_file_name.name}:{base_stat.st_size}:{base_stat.st_mtime_ns}".encode()
+        )
+    return content_hash.hexdigest()
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from requests import RequestException, Response, Session
+
+from ixp_tracker.archive import (
+    compress_archive_file,
+    get_archive_file_name,
+    get_partial_file_name,
+)
+from ixp_tracker.conf import (
+    DATA_ARCHIVE_DIRECTORY_URL,
+    DATA_ARCHIVE_URL,
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+)
+
+logger = logging.getLogger("ixp_tracker")
+
+CATALOG_FILE_NAME = "caida_catalog.json"
+DUMP_FILE_PATTERN = re.compile(r"peeringdb_2_dump_(\d{4})_(\d{2})_(\d{2})\.json")
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+DOWNLOAD_ATTEMPTS = 5
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class CaidaCatalog:
+    """
+    Keeps track of which days CAIDA has a dump for, so we can go straight to the right file instead of requesting each
+    day in turn. We build it a month at a time from CAIDA's directory listings, and save it in the local archive
+    (if there is one) so the listings are only downloaded once.
+
+    A listing only tells us about the days before the date we downloaded it, as newer dumps may still be added. For
+    those days we download the listing again. If we can't get a listing we don't know anything about that month, so
+    the caller needs to request the file to find out.
+    """
+
+    def __init__(self, archive_path: Path | None, session: Session):
+        self.catalog_file = (
+            archive_path / CATALOG_FILE_NAME
+            if archive_path is not None and archive_path.is_dir()
+            else None
+        )
+        self.session = session
+        self.months: dict[str, dict] = self.load()
+        self.unlisted_months: set[str] = set()
+        # The catalog can be shared by several download workers
+        self.lock = threading.Lock()
+
+    def has_dump(self, dump_date: datetime) -> bool | None:
+        with self.lock:
+            return self.check_month(dump_date)
+
+    def check_month(self, dump_date: datetime) -> bool | None:
+        month_key = f"{dump_date.year}-{dump_date.month:02}"
+        month = self.months.get(month_key)
+        if month_key in self.unlisted_months:
+            return None
+        if month is None or dump_date.date().isoformat() >= month["listed_on"]:
+            month = self.list_month(dump_date)
+            if month is None:
+                # We don't try again for the same month, as it's likely to fail in the same way
+                self.unlisted_months.add(month_key)
+                return None
+            self.months[month_key] = month
+            self.save()
+        return dump_date.day in month["days"]
+
+    def list_month(self, month_date: datetime) -> dict | None:
+        url = DATA_ARCHIVE_DIRECTORY_URL.format(
+            year=month_date.year, month=month_date.month
+        )
+        try:
+            response = self.session.get(url)
+        except RequestException as e:
+            logger.debug(
+                "Cannot get CAIDA directory listing",
+                extra={"url": url, "error": str(e)},
+            )
+            return None
+        listed_on = datetime.now(timezone.utc).date().isoformat()
+        if response.status_code == 404:
+            # There's no directory at all, so there are no dumps for that month
+            return {"days": [], "listed_on": listed_on}
+        if response.status_code != 200:
+            logger.debug(
+                "Cannot get CAIDA directory listing",
+                extra={"url": url, "status": response.status_code},
+            )
+            return None
+        days = {
+            int(day)
+            for year, month, day in DUMP_FILE_PATTERN.findall(response.text)
+            if int(year) == month_date.year and int(month) == month_date.month
+        }
+        return {"days": sorted(days), "listed_on": listed_on}
+
+    def load(self) -> dict[str, dict]:
+        if self.catalog_file is None:
+            return {}
+        try:
+            with open(self.catalog_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        if self.catalog_file is None:
+            return
+        partial_file_name = self.catalog_file.with_name(
+            f"{self.catalog_file.name}.part"
+        )
+        with open(partial_file_name, "w", encoding="utf-8") as f:
+            json.dump(self.months, f, indent=4, sort_keys=True)
+        os.replace(partial_file_name, self.catalog_file)
+
+
+def download_dump(
+    dump_date: datetime, archive_path: Path, session: Session
+) -> Path | None:
+    """
+    Streams a dump from CAIDA into the local archive, so we never hold the whole file in memory. We download to a
+    partial file first. If the download is interrupted we carry on from where it stopped with a range request, both
+    straight away and the next time we try to download the same dump. We keep the validator (ETag or Last-Modified)
+    of the first response next to the partial file and send it as If-Range, so if the dump has changed on the server we
+    get the whole file back rather than the rest of a different one. Without a validator we can't be sure the partial
+    file still matches, so we start again. The file is only moved into the archive once its size matches what CAIDA
+    told us to expect.
+    """
+    url = DATA_ARCHIVE_URL.format(
+        year=dump_date.year, month=dump_date.month, day=dump_date.day
+    )
+    file_name = get_archive_file_name(archive_path, dump_date)
+    partial_file_name = get_partial_file_name(file_name)
+    validator_file_name = get_validator_file_name(partial_file_name)
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        offset = partial_file_name.stat().st_size if partial_file_name.exists() else 0
+        validator = load_validator(validator_file_name) if offset > 0 else None
+        headers = (
+            {"Range": f"bytes={offset}-", "If-Range": validator}
+            if validator is not None
+            else {}
+        )
+        try:
+            with session.get(url, headers=headers, stream=True) as response:
+                if response.status_code == 416:
+                    # Whatever we had doesn't match the file on the server any more
+                    remove_partial_download(partial_file_name)
+                    continue
+                if response.status_code not in [200, 206]:
+                    return None
+                if response.status_code == 200:
+                    # Either the dump has changed, the server has ignored the range or we didn't ask for one
+                    offset = 0
+                    save_validator(validator_file_name, response)
+                expected_size = get_expected_size(response, offset)
+                with open(partial_file_name, "ab" if offset > 0 else "wb") as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+        except (RequestException, OSError) as e:
+            logger.info(
+                "Archive download interrupted",
+                extra={"url": url, "attempt": attempt + 1, "error": str(e)},
+            )
+            continue
+        downloaded_size = partial_file_name.stat().st_size
+        if expected_size is not None and downloaded_size != expected_size:
+            logger.warning(
+                "Archive download is the wrong size",
+                extra={
+                    "url": url,
+                    "expected_size": expected_size,
+                    "downloaded_size": downloaded_size,
+                },
+            )
+            remove_partial_download(partial_file_name)
+            continue
+        if downloaded_size == 0:
+            remove_partial_download(partial_file_name)
+            return None
+        os.replace(partial_file_name, file_name)
+        validator_file_name.unlink(missing_ok=True)
+        logger.debug(
+            "Retrieved archive file from CAIDA", extra={"processing_date": dump_date}
+        )
+        if IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION is not None:
+            return compress_archive_file(
+                file_name, IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION
+            )
+        return file_name
+    logger.warning("Cannot download archive file", extra={"url": url})
+    return None
+
+
+def get_validator_file_name(partial_file_name: Path) -> Path:
+    return partial_file_name.with_name(f"{partial_file_name.name}.validator")
+
+
+def load_validator(validator_file_name: Path) -> str | None:
+    try:
+        return validator_file_name.read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def save_validator(validator_file_name: Path, response: Response):
+    # A weak ETag can't be used for a range request, so we fall back to Last-Modified
+    etag = response.headers.get("ETag")
+    validator = (
+        etag
+        if etag is not None and not etag.startswith("W/")
+        else response.headers.get("Last-Modified")
+    )
+    if validator is None:
+        validator_file_name.unlink(missing_ok=True)
+        return
+    validator_file_name.write_text(validator, encoding="utf-8")
+
+
+def remove_partial_download(partial_file_name: Path):
+    partial_file_name.unlink(missing_ok=True)
+    get_validator_file_name(partial_file_name).unlink(missing_ok=True)
+
+
+def get_expected_size(response: Response, offset: int) -> int | None:
+    if response.status_code == 206:
+        match = CONTENT_RANGE_PATTERN.match(response.headers.get("Content-Range", ""))
+        if match is not None and match.group(2) != "*":
+            return int(match.group(2))
+        return None
+    # If the server compresses the response, the length is of the compressed content so we can't use it
+    if "Content-Encoding" in response.headers:
+        return None
+    content_length = response.headers.get("Content-Length")
+    return int(content_length) if content_length is not None else None
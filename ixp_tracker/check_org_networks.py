@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from ixp_tracker.data_lookup import ASNGeoLookup
@@ -13,36 +14,35 @@ def check_org_networks(
     We may need this distinction later in the process when deciding to re-activate an IXP that has previously beem
     de-activated due to this logic. Lack of data is probably not a strong enough signal to activate or de-activate an IXP.
     """
-    ixp_checks: dict[int, bool | None] = {}
     last_month = (as_at.replace(day=1) - timedelta(days=1)).replace(day=1)
+    # We index the networks by org once, rather than searching all of them for every IX
+    org_networks: dict[int | None, list[int]] = defaultdict(list)
+    for n in networks:
+        org_networks[n.get("org_id", 0)].append(n["asn"])
+    # Several IXs can belong to the same org, so we only check each org once and look up each network once per date
+    network_checks: dict[tuple[int, datetime], bool] = {}
+    org_checks: dict[int | None, bool | None] = {}
+
+    def check_network(asn: int, check_date: datetime) -> bool:
+        if (asn, check_date) not in network_checks:
+            network_checks[(asn, check_date)] = as_zz_country_check(
+                asn,
+                asn_lookup.get_iso2_country(asn, check_date),
+                NROStatus(asn_lookup.get_status(asn, check_date)),
+            )
+        return network_checks[(asn, check_date)]
+
+    def check_org(org_id: int | None) -> bool | None:
+        if org_id == 0 or len(org_networks.get(org_id, [])) == 0:
+            return None
+        return any(check_network(n, as_at) for n in org_networks[org_id]) or any(
+            check_network(n, last_month) for n in org_networks[org_id]
+        )
+
+    ixp_checks: dict[int, bool | None] = {}
     for ix in ixs:
         org_id = ix.get("org_id", 0)
-        if org_id == 0:
-            ixp_checks[ix["id"]] = None
-            continue
-        org_networks = [n["asn"] for n in networks if n.get("org_id", 0) == org_id]
-        if len(org_networks) == 0:
-            ixp_checks[ix["id"]] = None
-            continue
-        if any(
-            as_zz_country_check(
-                n,
-                asn_lookup.get_iso2_country(n, as_at),
-                NROStatus(asn_lookup.get_status(n, as_at)),
-            )
-            for n in org_networks
-        ):
-            ixp_checks[ix["id"]] = True
-            continue
-        if any(
-            as_zz_country_check(
-                n,
-                asn_lookup.get_iso2_country(n, last_month),
-                NROStatus(asn_lookup.get_status(n, last_month)),
-            )
-            for n in org_networks
-        ):
-            ixp_checks[ix["id"]] = True
-            continue
-        ixp_checks[ix["id"]] = False
+        if org_id not in org_checks:
+            org_checks[org_id] = check_org(org_id)
+        ixp_checks[ix["id"]] = org_checks[org_id]
     return ixp_checks
@@ -18,6 +18,9 @@ except (TypeError, ValueError):
     raise ImproperlyConfigured("IXP_TRACKER_PEERING_DB_URL must be a string value")
 
 DATA_ARCHIVE_URL = "https://publicdata.caida.org/datasets/peeringdb/{year}/{month:02d}/peeringdb_2_dump_{year}_{month:02d}_{day:02d}.json"
+DATA_ARCHIVE_DIRECTORY_URL = (
+    "https://publicdata.caida.org/datasets/peeringdb/{year}/{month:02d}/"
+)
 # Optional local data archive. When backfilling data the lib will look here first, before trying to get the data from CAIDA
 IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH: str | None
 try:
@@ -30,3 +33,183 @@ except (TypeError, ValueError):
     raise ImproperlyConfigured(
         "IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH must be a string value"
     )
+# Optional compression for files saved to the local data archive, either "gzip" or "xz".
+# Files are read back whatever their compression.
+IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION: str | None
+try:
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION = (
+        str(settings.IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION)
+        if settings.IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION is not None
+        else None
+    )
+except AttributeError:
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION = None
+if IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION not in [None, "gzip", "xz"]:
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION must be one of 'gzip' or 'xz'"
+    )
+
+# If set, the local data archive only keeps a full dump every this number of days. Dumps saved in between only
+# keep the objects that have changed since the last full dump. 0 keeps a full dump every day.
+IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL: int
+try:
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL = int(
+        settings.IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL
+    )
+except AttributeError:
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL = 0
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL must be an integer value"
+    )
+if IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL < 0:
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL must not be negative"
+    )
+
+# The JSON library used to read archived dumps: "orjson" (an optional dependency) or "json" from the standard library.
+# "auto" uses orjson if it is installed.
+IXP_TRACKER_JSON_CODEC: str
+try:
+    IXP_TRACKER_JSON_CODEC = str(settings.IXP_TRACKER_JSON_CODEC)
+except AttributeError:
+    IXP_TRACKER_JSON_CODEC = "auto"
+if IXP_TRACKER_JSON_CODEC not in ["auto", "json", "orjson"]:
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_JSON_CODEC must be one of 'auto', 'json' or 'orjson'"
+    )
+
+# Maximum number of PeeringDB endpoints to download at the same time. All downloads share one pooled HTTP session.
+IXP_TRACKER_PEERING_DB_MAX_WORKERS: int
+try:
+    IXP_TRACKER_PEERING_DB_MAX_WORKERS = int(
+        settings.IXP_TRACKER_PEERING_DB_MAX_WORKERS
+    )
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_MAX_WORKERS = 1
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_PEERING_DB_MAX_WORKERS must be an integer value"
+    )
+if IXP_TRACKER_PEERING_DB_MAX_WORKERS < 1:
+    raise ImproperlyConfigured("IXP_TRACKER_PEERING_DB_MAX_WORKERS must be at least 1")
+
+# Only download the PeeringDB objects that have changed since the most recent dump in the local data archive
+IXP_TRACKER_PEERING_DB_INCREMENTAL: bool
+try:
+    IXP_TRACKER_PEERING_DB_INCREMENTAL = bool(
+        settings.IXP_TRACKER_PEERING_DB_INCREMENTAL
+    )
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_INCREMENTAL = False
+
+# Which PeeringDB collections and fields to download. "full" keeps complete dumps in the local archive,
+# "import" only downloads what the importer uses
+IXP_TRACKER_PEERING_DB_FETCH_PROFILE: str
+try:
+    IXP_TRACKER_PEERING_DB_FETCH_PROFILE = str(
+        settings.IXP_TRACKER_PEERING_DB_FETCH_PROFILE
+    )
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_FETCH_PROFILE = "full"
+if IXP_TRACKER_PEERING_DB_FETCH_PROFILE not in ["full", "import"]:
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_PEERING_DB_FETCH_PROFILE must be one of 'full' or 'import'"
+    )
+
+# The number of objects to request per page from the PeeringDB API. 0 downloads each collection in a single request
+IXP_TRACKER_PEERING_DB_PAGE_SIZE: int
+try:
+    IXP_TRACKER_PEERING_DB_PAGE_SIZE = int(settings.IXP_TRACKER_PEERING_DB_PAGE_SIZE)
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_PAGE_SIZE = 0
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_PEERING_DB_PAGE_SIZE must be an integer value"
+    )
+
+# The number of pages of the largest PeeringDB collections (net and netixlan) to request at the same time.
+# This only has an effect if IXP_TRACKER_PEERING_DB_PAGE_SIZE is set.
+IXP_TRACKER_PEERING_DB_PAGE_WINDOWS: int
+try:
+    IXP_TRACKER_PEERING_DB_PAGE_WINDOWS = int(
+        settings.IXP_TRACKER_PEERING_DB_PAGE_WINDOWS
+    )
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_PAGE_WINDOWS = 1
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_PEERING_DB_PAGE_WINDOWS must be an integer value"
+    )
+if IXP_TRACKER_PEERING_DB_PAGE_WINDOWS < 1:
+    raise ImproperlyConfigured("IXP_TRACKER_PEERING_DB_PAGE_WINDOWS must be at least 1")
+
+# Write each page of PeeringDB data straight to a compressed dump in the local archive rather than holding it all in memory
+IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE: bool
+try:
+    IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE = bool(
+        settings.IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE
+    )
+except AttributeError:
+    IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE = False
+
+# The maximum number of requests per second to send to each of PeeringDB and CAIDA. 0 means we don't pace requests
+# until the server starts throttling them.
+IXP_TRACKER_HTTP_REQUESTS_PER_SECOND: float
+try:
+    IXP_TRACKER_HTTP_REQUESTS_PER_SECOND = float(
+        settings.IXP_TRACKER_HTTP_REQUESTS_PER_SECOND
+    )
+except AttributeError:
+    IXP_TRACKER_HTTP_REQUESTS_PER_SECOND = 0
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_HTTP_REQUESTS_PER_SECOND must be a numeric value"
+    )
+
+# Optional directory to cache HTTP responses in. If set, we send conditional requests for anything we've downloaded
+# before and use the cached copy if it hasn't changed
+IXP_TRACKER_HTTP_CACHE_PATH: str | None
+try:
+    IXP_TRACKER_HTTP_CACHE_PATH = str(settings.IXP_TRACKER_HTTP_CACHE_PATH)
+except AttributeError:
+    IXP_TRACKER_HTTP_CACHE_PATH = None
+except (TypeError, ValueError):
+    raise ImproperlyConfigured("IXP_TRACKER_HTTP_CACHE_PATH must be a string value")
+
+# Cached HTTP responses that haven't been used for this many days are deleted (many PeeringDB requests include the date)
+IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS: int
+try:
+    IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS = int(
+        settings.IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS
+    )
+except AttributeError:
+    IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS = 7
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS must be an integer value"
+    )
+if IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS < 1:
+    raise ImproperlyConfigured("IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS must be at least 1")
+
+# Skip comparing IXP and ASN records with their aggregates if the record hasn't changed since the last import
+IXP_TRACKER_SKIP_UNCHANGED_RECORDS: bool
+try:
+    IXP_TRACKER_SKIP_UNCHANGED_RECORDS = bool(
+        settings.IXP_TRACKER_SKIP_UNCHANGED_RECORDS
+    )
+except AttributeError:
+    IXP_TRACKER_SKIP_UNCHANGED_RECORDS = False
+
+# The number of ASNs to run the additional data source lookups for at the same time
+IXP_TRACKER_LOOKUP_MAX_WORKERS: int
+try:
+    IXP_TRACKER_LOOKUP_MAX_WORKERS = int(settings.IXP_TRACKER_LOOKUP_MAX_WORKERS)
+except AttributeError:
+    IXP_TRACKER_LOOKUP_MAX_WORKERS = 1
+except (TypeError, ValueError):
+    raise ImproperlyConfigured(
+        "IXP_TRACKER_LOOKUP_MAX_WORKERS must be an integer value"
+    )
+if IXP_TRACKER_LOOKUP_MAX_WORKERS < 1:
+    raise ImproperlyConfigured("IXP_TRACKER_LOOKUP_MAX_WORKERS must be at least 1")
@@ -1,13 +1,18 @@
+import json
 import logging
 import re
+from collections import defaultdict
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 from typing import TypeVar
 from uuid import UUID
 
+from django.db import IntegrityError, connection, transaction
+
 # At some point we might want to change the ES persistence to depend on a neutral DTO rather than this Django model
-from ixp_tracker.models import StoredEvent, AggregateSnapshot
+from ixp_tracker.json import IXPJSONEncoder
+from ixp_tracker.models import StoredEvent, AggregateSnapshot, ImportRun
 
 logger = logging.getLogger("ixp_tracker")
 
@@ -67,6 +72,10 @@ class DataAlreadyImported(Exception):
     pass
 
 
+class EventSequenceConflict(Exception):
+    pass
+
+
 class Projection(ABC):
     def __init__(self):
         if self.__getattribute__("aggregate_types") is None:
@@ -148,6 +157,23 @@ class EventStorePersistence(ABC):
     def has_existing_data(self, as_at: datetime) -> bool:
         pass
 
+    def append_events(
+        self,
+        events: list[tuple[DomainEvent, StoredEvent]],
+        expected_version: int,
+    ):
+        """
+        Saves events for a single aggregate, setting their sequences to follow on from the latest event stored for it.
+        `expected_version` is the sequence the aggregate was at when the events were created.
+        This default gets each sequence in turn without checking the expected version, implementations should override
+        it to raise EventSequenceConflict if the aggregate has changed since the expected version.
+        """
+        for event, stored_event in events:
+            stored_event.event_sequence = self.get_event_sequence(
+                event, stored_event.aggregate_id
+            )
+            self.save_event(stored_event)
+
 
 class EventStore:
     def __init__(self, event_map, db: EventStorePersistence):
@@ -160,28 +186,46 @@ class EventStore:
         self.date_now = date_in_past
 
     def store(self, aggregate: T, event: DomainEvent) -> T:
-        event_sequence = self.db.get_event_sequence(event, aggregate.id)
-        event_data = asdict(event)
-        event_data = {
-            key: value
-            for key, value in event_data.items()
-            if key not in ["aggregate"] and not isinstance(value, ValueNotChanged)
-        }
-        if len(event_data.keys()) == 0:
-            raise EventHasNoUpdatedFields
-
-        stored_event = StoredEvent(
-            aggregate_id=aggregate.id,
-            aggregate_type=type(aggregate).__name__,
-            event_date=self.date_now or datetime.now(timezone.utc),
-            event_type=type(event).__name__,
-            event_sequence=event_sequence,
-            data=event_data,
-        )
-        self.db.save_event(stored_event)
-        aggregate.apply_event(event, stored_event.event_sequence)
-        for listener in self.listeners:
-            listener.handle(stored_event, aggregate)
+        return self.append(aggregate, [event], aggregate.sequence)
+
+    def append(
+        self, aggregate: T, events: list[DomainEvent], expected_version: int
+    ) -> T:
+        """
+        Stores a batch of events for an aggregate, with consecutive sequences after `expected_version`. Raises
+        EventSequenceConflict if another writer has stored events for the aggregate since then.
+        """
+        event_date = self.date_now or datetime.now(timezone.utc)
+        stored_events = []
+        for event in events:
+            event_data = asdict(event)
+            event_data = {
+                key: value
+                for key, value in event_data.items()
+                if key not in ["aggregate"] and not isinstance(value, ValueNotChanged)
+            }
+            if len(event_data.keys()) == 0:
+                raise EventHasNoUpdatedFields
+            stored_events.append(
+                (
+                    event,
+                    StoredEvent(
+                        aggregate_id=aggregate.id,
+                        aggregate_type=type(aggregate).__name__,
+                        event_date=event_date,
+                        event_type=type(event).__name__,
+                        event_sequence=0,
+                        data=event_data,
+                    ),
+                )
+            )
+        if len(stored_events) == 0:
+            return aggregate
+        self.db.append_events(stored_events, expected_version)
+        for event, stored_event in stored_events:
+            aggregate.apply_event(event, stored_event.event_sequence)
+            for listener in self.listeners:
+                listener.handle(stored_event, aggregate)
 
         return aggregate
 
@@ -292,16 +336,52 @@ class EventStore:
 
 class DjangoEventStore(EventStorePersistence):
     def get_event_sequence(self, event: DomainEvent, aggregate_id: UUID) -> int:
+        return self.get_latest_sequence(aggregate_id) + 1
+
+    def get_latest_sequence(self, aggregate_id: UUID) -> int:
         previous_event = (
             StoredEvent.objects.filter(aggregate_id=aggregate_id)
             .order_by("-event_sequence")
             .first()
         )
-        return previous_event.event_sequence + 1 if previous_event else 1
+        return previous_event.event_sequence if previous_event else 0
 
     def save_event(self, event: StoredEvent):
         event.save()
 
+    def append_events(
+        self,
+        events: list[tuple[DomainEvent, StoredEvent]],
+        expected_version: int,
+    ):
+        """
+        Inserts the events straight after the expected version, without reading the latest sequence first. If another
+        writer has already used any of those sequences, the unique constraint on the sequence rejects the whole batch.
+        The events were worked out from an aggregate that is now out of date, so we raise EventSequenceConflict for the
+        caller to reload the aggregate and work them out again.
+        """
+        stored_events = [stored_event for _, stored_event in events]
+        aggregate_id = stored_events[0].aggregate_id
+        for offset, stored_event in enumerate(stored_events):
+            stored_event.event_sequence = expected_version + offset + 1
+        try:
+            if connection.in_atomic_block:
+                # The savepoint means a conflict doesn't break the transaction we're in
+                with transaction.atomic():
+                    self.insert_events(stored_events)
+            else:
+                self.insert_events(stored_events)
+        except IntegrityError:
+            raise EventSequenceConflict(
+                f"Aggregate {aggregate_id} has changed since version {expected_version}"
+            )
+
+    def insert_events(self, stored_events: list[StoredEvent]):
+        if len(stored_events) == 1:
+            stored_events[0].save()
+        else:
+            StoredEvent.objects.bulk_create(stored_events)
+
     def get_aggregate_events(
         self,
         aggregate_id: UUID,
@@ -359,5 +439,133 @@ class DjangoEventStore(EventStorePersistence):
             return snapshot.data, snapshot.event_sequence
 
     def has_existing_data(self, as_at: datetime) -> bool:
-        existing_events = StoredEvent.objects.filter(event_date__gte=as_at)
-        return existing_events.count() > 0
+        # Every full import is recorded in the ledger, so once there's anything in it we only need to look there
+        if ImportRun.objects.exists():
+            return ImportRun.objects.filter(processing_date__gte=as_at).exists()
+        # Otherwise check for any data imported before the ledger was added
+        return StoredEvent.objects.filter(event_date__gte=as_at).exists()
+
+
+class InMemoryEventStore(EventStorePersistence):
+    """
+    Keeps all the events and snapshots in memory, so nothing is saved to the db. Use `from_db()` to start with a copy
+    of everything already stored, e.g. to see what events an import would store without storing them.
+    Event and snapshot data is encoded and decoded as JSON, as it would be by the db, so aggregates are rebuilt the same.
+    """
+
+    def __init__(self):
+        self.events: dict[UUID, list[StoredEvent]] = defaultdict(list)
+        self.aggregate_types: dict[UUID, str] = {}
+        self.snapshots: dict[UUID, list[tuple[str, int, datetime]]] = defaultdict(list)
+        # The events stored since the store was created (i.e. not including those loaded from the db)
+        self.new_events: list[StoredEvent] = []
+        self.json_encoder = IXPJSONEncoder()
+
+    @classmethod
+    def from_db(cls, chunk_size: int = 2000) -> "InMemoryEventStore":
+        store = cls()
+        events = StoredEvent.objects.order_by("aggregate_id", "event_sequence")
+        for event in events.iterator(chunk_size=chunk_size):
+            store.add_event(event)
+        snapshots = AggregateSnapshot.objects.order_by("aggregate_id", "event_sequence")
+        for snapshot in snapshots.iterator(chunk_size=chunk_size):
+            store.snapshots[snapshot.aggregate_id].append(
+                (
+                    store.json_encoder.encode(snapshot.data),
+                    snapshot.event_sequence,
+                    snapshot.snapshot_date,
+                )
+            )
+        logger.debug(
+            "Loaded event store into memory",
+            extra={"aggregates": len(store.events), "snapshots": len(store.snapshots)},
+        )
+        return store
+
+    def add_event(self, event: StoredEvent):
+        self.events[event.aggregate_id].append(event)
+        self.aggregate_types[event.aggregate_id] = event.aggregate_type
+
+    def get_event_sequence(self, event: DomainEvent, aggregate_id: UUID) -> int:
+        aggregate_events = self.events.get(aggregate_id)
+        return aggregate_events[-1].event_sequence + 1 if aggregate_events else 1
+
+    def append_events(
+        self,
+        events: list[tuple[DomainEvent, StoredEvent]],
+        expected_version: int,
+    ):
+        aggregate_id = events[0][1].aggregate_id
+        aggregate_events = self.events.get(aggregate_id)
+        latest_sequence = aggregate_events[-1].event_sequence if aggregate_events else 0
+        if expected_version != latest_sequence:
+            raise EventSequenceConflict(
+                f"Aggregate {aggregate_id} has changed since version {expected_version}"
+            )
+        for offset, (_, stored_event) in enumerate(events):
+            stored_event.event_sequence = latest_sequence + offset + 1
+            self.save_event(stored_event)
+
+    def save_event(self, event: StoredEvent):
+        event.data = json.loads(self.json_encoder.encode(event.data))
+        self.add_event(event)
+        self.new_events.append(event)
+
+    def get_aggregate_events(
+        self,
+        aggregate_id: UUID,
+        aggregate_type: type[T],
+        sequence: int | None,
+        as_at: datetime | None = None,
+        version: int | None = None,
+    ) -> list[StoredEvent]:
+        return [
+            event
+            for event in self.events.get(aggregate_id, [])
+            if (sequence is None or event.event_sequence > sequence)
+            and (as_at is None or event.event_date <= as_at)
+            and (version is None or event.event_sequence <= version)
+        ]
+
+    def get_all(
+        self, aggregate_type: type[T], as_at: datetime | None = None
+    ) -> list[UUID]:
+        return [
+            aggregate_id
+            for aggregate_id, events in self.events.items()
+            if self.aggregate_types[aggregate_id] == aggregate_type.__name__
+            and (as_at is None or any(e.event_date <= as_at for e in events))
+        ]
+
+    def get_events(self) -> list[StoredEvent]:
+        return [event for events in self.events.values() for event in events]
+
+    def save_snapshot(
+        self, aggregate_id: UUID, data: dict, sequence: int, date_now: datetime
+    ):
+        snapshots = [s for s in self.snapshots[aggregate_id] if s[1] != sequence]
+        snapshots.append((self.json_encoder.encode(data), sequence, date_now))
+        self.snapshots[aggregate_id] = sorted(snapshots, key=lambda s: s[1])
+
+    def load_snapshot(
+        self,
+        aggregate_id: UUID,
+        as_at: datetime | None = None,
+        version: int | None = None,
+    ) -> tuple[dict, int] | tuple[None, None]:
+        snapshots = self.snapshots.get(aggregate_id, [])
+        if as_at is not None:
+            snapshots = [s for s in snapshots if s[2] <= as_at]
+        elif version is not None:
+            snapshots = [s for s in snapshots if s[1] <= version]
+        if len(snapshots) == 0:
+            return None, None
+        data, sequence, _ = snapshots[-1]
+        return json.loads(data), sequence
+
+    def has_existing_data(self, as_at: datetime) -> bool:
+        return any(
+            event.event_date >= as_at
+            for events in self.events.values()
+            for event in events
+        )
@@ -0,0 +1,52 @@
+import hashlib
+import json
+
+from ixp_tracker.json import IXPJSONEncoder
+from ixp_tracker.models import ImportFingerprint
+
+
+def get_fingerprint(*values) -> str:
+    return hashlib.sha256(
+        json.dumps(values, cls=IXPJSONEncoder, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class ImportFingerprints:
+    """
+    Keeps a hash of the values each record was last imported with, so we can tell which records haven't changed since
+    the last import and don't need comparing with their aggregates. New fingerprints are only saved once the whole
+    batch has been imported, so an import that fails part way through never skips anything it didn't finish.
+    """
+
+    def __init__(self, record_type: str):
+        self.record_type = record_type
+        self.previous: dict[int, str] = dict(
+            ImportFingerprint.objects.filter(record_type=record_type).values_list(
+                "record_id", "fingerprint"
+            )
+        )
+        self.changed: dict[int, str] = {}
+
+    def is_unchanged(self, record_id: int, fingerprint: str) -> bool:
+        return self.previous.get(record_id) == fingerprint
+
+    def update(self, record_id: int, fingerprint: str):
+        if self.previous.get(record_id) != fingerprint:
+            self.changed[record_id] = fingerprint
+
+    def save(self):
+        ImportFingerprint.objects.bulk_create(
+            [
+                ImportFingerprint(
+                    record_type=self.record_type,
+                    record_id=record_id,
+                    fingerprint=fingerprint,
+                )
+                for record_id, fingerprint in self.changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["record_type", "record_id"],
+            update_fields=["fingerprint"],
+        )
+        self.previous.update(self.changed)
+        self.changed = {}
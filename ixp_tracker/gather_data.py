@@ -1,17 +1,35 @@
 import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from json import JSONDecodeError
 from pathlib import Path
-from typing import TypedDict, Any
+from typing import TypedDict, Any, Iterator, cast
 
 from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3 import Retry
 
+from ixp_tracker.archive import (
+    diff_archive_data,
+    find_delta_base,
+    get_archive_date,
+    get_archive_file_name,
+    get_partial_file_name,
+    list_archive_files,
+    load_archive_file,
+    open_compressed_file,
+    write_archive_file,
+)
 from ixp_tracker.conf import (
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL,
+    IXP_TRACKER_PEERING_DB_FETCH_PROFILE,
+    IXP_TRACKER_PEERING_DB_MAX_WORKERS,
+    IXP_TRACKER_PEERING_DB_PAGE_SIZE,
+    IXP_TRACKER_PEERING_DB_PAGE_WINDOWS,
     IXP_TRACKER_PEERING_DB_URL,
 )
+from ixp_tracker.http import build_session, throttled_seconds
 
 logger = logging.getLogger("ixp_tracker")
 
@@ -24,7 +42,8 @@ class PeeringDbData(TypedDict):
     data: list[dict]
 
 
-class AllPeeringDbData(TypedDict):
+# Not every fetch profile downloads every collection
+class AllPeeringDbData(TypedDict, total=False):
     as_set: PeeringDbData
     campus: PeeringDbData
     carrier: PeeringDbData
@@ -41,75 +60,234 @@ class AllPeeringDbData(TypedDict):
     poc: PeeringDbData
 
 
+PEERING_DB_ENDPOINTS = [
+    "as_set",
+    "campus",
+    "carrier",
+    "carrierfac",
+    "fac",
+    "ix",
+    "ixfac",
+    "ixlan",
+    "ixpfx",
+    "net",
+    "netfac",
+    "netixlan",
+    "org",
+    "poc",
+]
+# These collections are big enough that it's worth requesting several pages at the same time
+WINDOWED_ENDPOINTS = ["net", "netixlan"]
+# The collections and fields used by the importer. We always keep "id" and "status" so we can merge incremental changes
+IMPORT_FIELDS: dict[str, list[str] | None] = {
+    "ix": [
+        "id",
+        "status",
+        "name",
+        "name_long",
+        "city",
+        "website",
+        "country",
+        "created",
+        "updated",
+        "fac_count",
+        "org_id",
+    ],
+    "net": ["id", "status", "asn", "name", "info_type", "policy_general", "org_id"],
+    "netixlan": [
+        "id",
+        "status",
+        "ix_id",
+        "asn",
+        "created",
+        "updated",
+        "is_rs_peer",
+        "speed",
+    ],
+}
+# Each profile maps the endpoints to download to the fields to request (None for all fields)
+FETCH_PROFILES: dict[str, dict[str, list[str] | None]] = {
+    "full": {endpoint: None for endpoint in PEERING_DB_ENDPOINTS},
+    "import": IMPORT_FIELDS,
+}
+
+
 def get_data(
     endpoint: str,
     limit: int = 0,
+    session: Session | None = None,
+    since: datetime | None = None,
+    fields: list[str] | None = None,
+    windows: int = 1,
 ) -> list[dict]:
+    all_data = []
+    for page in get_data_pages(endpoint, limit, session, since, fields, windows):
+        all_data += page
+    return all_data
+
+
+def get_data_pages(
+    endpoint: str,
+    limit: int = 0,
+    session: Session | None = None,
+    since: datetime | None = None,
+    fields: list[str] | None = None,
+    windows: int = 1,
+) -> Iterator[list[dict]]:
     url = f"{IXP_TRACKER_PEERING_DB_URL}{endpoint}"
-    session = Session()
-    retries = Retry(
-        total=4,
-        backoff_factor=0.5,
-        status_forcelist=[
-            413,
-            429,
-            500,
-            502,
-            503,
-            504,
-        ],  # retry if we receive one of these status codes
-        allowed_methods={"GET"},
-        raise_on_redirect=False,
-        raise_on_status=False,
-    )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+    session = session or build_session()
     query_params: dict[str, Any] = {}
+    if fields is not None:
+        query_params["fields"] = ",".join(fields)
+    if since is not None:
+        # PeeringDB returns every object updated after this (unix) timestamp, including deleted objects
+        query_params["since"] = int(since.timestamp())
+    if limit > 0 and windows > 1:
+        yield from get_windowed_data_pages(session, url, query_params, limit, windows)
+        return
     if limit > 0:
         query_params["limit"] = limit
         query_params["skip"] = 0
     finished = False
-    all_data = []
     while not finished:
         finished = True
-        data = session.get(
-            url,
-            params=query_params,
+        data = get_page(session, url, query_params)
+        yield data
+        if limit > 0 and len(data) > 0:
+            query_params["skip"] = query_params["skip"] + limit
+            finished = False
+
+
+def get_windowed_data_pages(
+    session: Session,
+    url: str,
+    query_params: dict[str, Any],
+    limit: int,
+    windows: int,
+) -> Iterator[list[dict]]:
+    """
+    Requests the next few pages at the same time, then yields them in skip order. As the data can change between
+    requests an object can shift from one page to the next, so we drop any we've already seen.
+    """
+    seen_ids: set[int] = set()
+    skip = 0
+    finished = False
+    with ThreadPoolExecutor(max_workers=windows) as executor:
+        while not finished:
+            window_params = [
+                {**query_params, "limit": limit, "skip": skip + (window * limit)}
+                for window in range(windows)
+            ]
+            pages = list(
+                executor.map(
+                    lambda params: get_page(session, url, params), window_params
+                )
+            )
+            for page in pages:
+                new_records = []
+                for record in page:
+                    record_id = record.get("id")
+                    if record_id in seen_ids:
+                        continue
+                    if record_id is not None:
+                        seen_ids.add(record_id)
+                    new_records.append(record)
+                yield new_records
+                if len(page) < limit:
+                    finished = True
+                    break
+            skip += windows * limit
+
+
+def get_page(session: Session, url: str, query_params: dict[str, Any]) -> list[dict]:
+    data = session.get(
+        url,
+        params=query_params,
+    )
+    if data.status_code >= 300:
+        # How do we handle errors here? Perhaps we need retries? Or do we bail if there's a single error?
+        logger.warning("Cannot retrieve data", extra={"status": data.status_code})
+        raise PeeringDbDataError
+    try:
+        return data.json().get("data", [])
+    except JSONDecodeError as e:
+        # How do we handle errors here? Perhaps we need retries? Or do we bail if there's a single error?
+        logger.warning("Cannot decode json data", extra={"error": str(e)})
+        raise PeeringDbDataError
+
+
+def gather_data(
+    max_workers: int | None = None,
+    previous_data: AllPeeringDbData | None = None,
+    since: datetime | None = None,
+    profile: str | None = None,
+) -> AllPeeringDbData:
+    """
+    If previous data and a since date are passed in, we only request the objects that have changed since that date
+    and merge them into the previous data. Any collection missing from the previous data is downloaded in full.
+    """
+    max_workers = max_workers or IXP_TRACKER_PEERING_DB_MAX_WORKERS
+    endpoint_fields = FETCH_PROFILES[profile or IXP_TRACKER_PEERING_DB_FETCH_PROFILE]
+    endpoints = list(endpoint_fields.keys())
+    page_size = IXP_TRACKER_PEERING_DB_PAGE_SIZE
+    session = build_session(max_workers * IXP_TRACKER_PEERING_DB_PAGE_WINDOWS)
+    # The rate limiters last for the whole process, so we only log the time spent waiting during this download
+    throttled_before = throttled_seconds()
+    logger.debug(
+        "Downloading PeeringDB data",
+        extra={"workers": max_workers, "since": since, "endpoints": endpoints},
+    )
+
+    def gather_endpoint(endpoint: str) -> list[dict]:
+        fields = endpoint_fields[endpoint]
+        previous = cast(dict[str, PeeringDbData], previous_data or {}).get(endpoint)
+        if previous is None or since is None:
+            return get_data(
+                f"/{endpoint}",
+                page_size,
+                session=session,
+                fields=fields,
+                windows=get_page_windows(endpoint),
+            )
+        changes = get_data(
+            f"/{endpoint}",
+            page_size,
+            session=session,
+            since=since,
+            fields=fields,
+            windows=get_page_windows(endpoint),
         )
-        if data.status_code >= 300:
-            # How do we handle errors here? Perhaps we need retries? Or do we bail if there's a single error?
-            logger.warning("Cannot retrieve data", extra={"status": data.status_code})
-            raise PeeringDbDataError
-        try:
-            data = data.json().get("data", [])
-            all_data += data
-            if limit > 0 and len(data) > 0:
-                query_params["skip"] = query_params["skip"] + limit
-                finished = False
-        except JSONDecodeError as e:
-            # How do we handle errors here? Perhaps we need retries? Or do we bail if there's a single error?
-            logger.warning("Cannot decode json data", extra={"error": str(e)})
-            raise PeeringDbDataError
-    return all_data
+        return merge_changes(previous.get("data", []), changes)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map() returns the results in the same order as the endpoints, whatever order the downloads finish in
+        results = executor.map(gather_endpoint, endpoints)
+        all_data = {
+            endpoint: {"data": data} for endpoint, data in zip(endpoints, results)
+        }
+    logger.info(
+        "Downloaded PeeringDB data",
+        extra={"throttled_seconds": throttled_seconds() - throttled_before},
+    )
+    if "poc" in all_data:
+        all_data["poc"]["data"] = [
+            p for p in all_data["poc"]["data"] if p.get("visible") == "Public"
+        ]
+    return all_data  # type: ignore
 
 
-def gather_data() -> AllPeeringDbData:
-    poc_data = [p for p in get_data("/poc") if p.get("visible") == "Public"]
-    return {
-        "as_set": {"data": get_data("/as_set")},
-        "campus": {"data": get_data("/campus")},
-        "carrier": {"data": get_data("/carrier")},
-        "carrierfac": {"data": get_data("/carrierfac")},
-        "fac": {"data": get_data("/fac")},
-        "ix": {"data": get_data("/ix")},
-        "ixfac": {"data": get_data("/ixfac")},
-        "ixlan": {"data": get_data("/ixlan")},
-        "ixpfx": {"data": get_data("/ixpfx")},
-        "net": {"data": get_data("/net")},
-        "netfac": {"data": get_data("/netfac")},
-        "netixlan": {"data": get_data("/netixlan")},
-        "org": {"data": get_data("/org")},
-        "poc": {"data": poc_data},
-    }
+def get_page_windows(endpoint: str) -> int:
+    return IXP_TRACKER_PEERING_DB_PAGE_WINDOWS if endpoint in WINDOWED_ENDPOINTS else 1
+
+
+def merge_changes(previous: list[dict], changes: list[dict]) -> list[dict]:
+    merged = {record["id"]: record for record in previous}
+    for change in changes:
+        if change.get("status") == "deleted":
+            merged.pop(change["id"], None)
+        else:
+            merged[change["id"]] = change
+    return list(merged.values())
 
 
 def save_data(
@@ -117,6 +295,108 @@ def save_data(
 ):
     if archive_path is None:
         return
-    file_name = f"{archive_path}/{processing_date.year}{processing_date.month:02}{processing_date.day:02}.peeringdb_2_dump.json"
-    with open(file_name, "w", encoding="utf-8") as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=4)
+    base_file_name = (
+        find_delta_base(
+            archive_path, processing_date, IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL
+        )
+        if IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL > 0
+        else None
+    )
+    base_date = get_archive_date(base_file_name) if base_file_name else None
+    if base_file_name is None or base_date is None:
+        write_archive_file(
+            get_archive_file_name(
+                archive_path,
+                processing_date,
+                IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+            ),
+            cast(dict, all_data),
+            IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+        )
+        return
+    delta = diff_archive_data(
+        load_archive_file(base_file_name), cast(dict, all_data), base_date
+    )
+    write_archive_file(
+        get_archive_file_name(
+            archive_path,
+            processing_date,
+            IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+            delta=True,
+        ),
+        delta,
+        IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+    )
+
+
+def stream_data(
+    processing_date: datetime, archive_path: Path, profile: str | None = None
+) -> Path:
+    """
+    Writes each page to a compressed dump as soon as it is downloaded, so we never hold a whole collection in memory.
+    The import reads back what it needs with archive.load_archive_file().
+    """
+    endpoint_fields = FETCH_PROFILES[profile or IXP_TRACKER_PEERING_DB_FETCH_PROFILE]
+    session = build_session(IXP_TRACKER_PEERING_DB_PAGE_WINDOWS)
+    throttled_before = throttled_seconds()
+    # Streamed dumps are always compressed, gzip unless another compression is configured
+    compression = IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION or "gzip"
+    file_name = get_archive_file_name(archive_path, processing_date, compression)
+    partial_file_name = get_partial_file_name(file_name)
+    with open_compressed_file(partial_file_name, "wt", compression) as f:
+        f.write("{")
+        for index, (endpoint, fields) in enumerate(endpoint_fields.items()):
+            if index > 0:
+                f.write(",")
+            f.write(f'\n"{endpoint}": {{"data": [')
+            records_written = 0
+            for page in get_data_pages(
+                f"/{endpoint}",
+                IXP_TRACKER_PEERING_DB_PAGE_SIZE,
+                session=session,
+                fields=fields,
+                windows=get_page_windows(endpoint),
+            ):
+                for record in page:
+                    if endpoint == "poc" and record.get("visible") != "Public":
+                        continue
+                    f.write("," if records_written > 0 else "")
+                    f.write("\n" + json.dumps(record, ensure_ascii=False))
+                    records_written += 1
+            f.write("\n]}")
+            logger.debug(
+                "Streamed PeeringDB data",
+                extra={"endpoint": endpoint, "records": records_written},
+            )
+        f.write("\n}\n")
+    os.replace(partial_file_name, file_name)
+    logger.info(
+        "Downloaded PeeringDB data",
+        extra={"throttled_seconds": throttled_seconds() - throttled_before},
+    )
+    return file_name
+
+
+def load_latest_data(
+    archive_path: Path | None, processing_date: datetime
+) -> tuple[AllPeeringDbData, datetime] | tuple[None, None]:
+    """
+    Returns the most recent dump saved on or before the processing date, along with the date it was saved for
+    """
+    latest_file = None
+    latest_date = None
+    for archive_date, archive_file in list_archive_files(archive_path):
+        if archive_date.date() <= processing_date.date():
+            latest_file = archive_file
+            latest_date = archive_date
+    if latest_file is None or latest_date is None:
+        return None, None
+    logger.debug("Found previous dump", extra={"archive_file": str(latest_file)})
+    try:
+        return load_archive_file(latest_file), latest_date  # type: ignore
+    except (ValueError, SyntaxError) as e:
+        logger.warning(
+            "Cannot decode previous dump",
+            extra={"archive_file": str(latest_file), "error": str(e)},
+        )
+        return None, None
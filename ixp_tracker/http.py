@@ -0,0 +1,359 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+from requests import PreparedRequest, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import Retry
+
+from ixp_tracker.conf import (
+    IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS,
+    IXP_TRACKER_HTTP_CACHE_PATH,
+    IXP_TRACKER_HTTP_REQUESTS_PER_SECOND,
+)
+
+logger = logging.getLogger("ixp_tracker")
+
+# The status codes servers use to tell us we're sending too many requests
+THROTTLE_STATUSES = [429, 503]
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every request to the same host in this process.
+
+    If no rate is set we don't pace requests until the server throttles us. After that we halve the rate we were
+    sending at each time we're throttled and slowly speed back up again while requests succeed, until we're back to
+    the rate we were sending at before we were first throttled and stop pacing requests again.
+    """
+
+    min_rate = 0.1
+    recovery_factor = 1.05
+    measurement_window = 10.0
+
+    def __init__(self, rate: float = 0):
+        self.max_rate = rate
+        self.rate = rate
+        # The rate we recover to after being throttled, before going back to the max rate
+        self.recovery_rate = rate
+        self.tokens = max(1.0, rate)
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled_seconds = 0.0
+        self.recent_requests: deque[float] = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0 and self.rate > 0:
+                    self.tokens = min(
+                        max(1.0, self.rate),
+                        self.tokens + ((now - self.last_refill) * self.rate),
+                    )
+                    self.last_refill = now
+                    wait = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+                if wait <= 0:
+                    if self.rate > 0:
+                        self.tokens -= 1
+                    self.recent_requests.append(now)
+                    while self.recent_requests[0] < now - self.measurement_window:
+                        self.recent_requests.popleft()
+                    return
+                self.throttled_seconds += wait
+            time.sleep(wait)
+
+    def throttle(self, retry_after: float | None = None):
+        with self.lock:
+            current_rate = self.rate or (
+                len(self.recent_requests) / self.measurement_window
+            )
+            was_unpaced = self.rate == 0
+            self.rate = max(self.min_rate, current_rate / 2)
+            if was_unpaced:
+                # We may have only sent a few requests before being throttled, so we always recover to at least
+                # twice the rate we drop to before we stop pacing requests again
+                self.recovery_rate = self.rate * 2
+            self.tokens = min(self.tokens, 1.0)
+            if retry_after is not None:
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+        logger.info(
+            "Server is throttling requests",
+            extra={"rate": self.rate, "retry_after": retry_after},
+        )
+
+    def record_success(self):
+        with self.lock:
+            if self.rate == self.max_rate:
+                return
+            self.rate = self.rate * self.recovery_factor
+            if self.rate >= self.recovery_rate:
+                self.rate = self.max_rate
+
+
+rate_limiters: dict[str, RateLimiter] = {}
+rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str) -> RateLimiter:
+    with rate_limiters_lock:
+        if host not in rate_limiters:
+            rate_limiters[host] = RateLimiter(IXP_TRACKER_HTTP_REQUESTS_PER_SECOND)
+        return rate_limiters[host]
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedRetry(Retry):
+    """
+    Makes sure that retries slow down every request to the host, not only the one that is being retried
+    """
+
+    rate_limiter: RateLimiter | None = None
+
+    def increment(
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ):
+        host = _pool.host if _pool is not None else urlparse(url or "").hostname
+        rate_limiter = get_rate_limiter(host) if host else None
+        if (
+            rate_limiter is not None
+            and response is not None
+            and response.status in THROTTLE_STATUSES
+        ):
+            rate_limiter.throttle(
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        new_retry.rate_limiter = rate_limiter
+        return new_retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    def send(self, request: PreparedRequest, *args, **kwargs) -> Response:
+        rate_limiter = get_rate_limiter(urlparse(str(request.url)).hostname or "")
+        rate_limiter.acquire()
+        response = super().send(request, *args, **kwargs)
+        if response.status_code not in THROTTLE_STATUSES:
+            rate_limiter.record_success()
+        elif not self.is_retried(request, response):
+            rate_limiter.throttle(
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+        return response
+
+    def is_retried(self, request: PreparedRequest, response: Response) -> bool:
+        # RateLimitedRetry has already throttled any response it retries, even if it ran out of retries for it
+        return isinstance(
+            self.max_retries, RateLimitedRetry
+        ) and self.max_retries.is_retry(str(request.method), response.status_code)
+
+
+class HttpCache:
+    """
+    Keeps the body of each response on disk along with the validators (ETag and Last-Modified) we need to ask the
+    server whether it has changed. Entries that haven't been used for `max_age` seconds are deleted the first time
+    the cache is used in each process.
+    """
+
+    # We only need to keep enough of the headers to rebuild a usable response. The body is stored decoded, so we
+    # don't keep Content-Encoding or Content-Length.
+    kept_headers = ["Content-Type", "ETag", "Last-Modified"]
+    pruned_paths: set[Path] = set()
+    pruned_paths_lock = threading.Lock()
+
+    def __init__(self, cache_path: Path, max_age: float | None = None):
+        self.cache_path = cache_path
+        if max_age is not None:
+            with self.pruned_paths_lock:
+                if cache_path not in self.pruned_paths:
+                    self.prune(max_age)
+                    self.pruned_paths.add(cache_path)
+
+    def prune(self, max_age: float):
+        if not self.cache_path.is_dir():
+            return
+        oldest = time.time() - max_age
+        pruned = 0
+        # This includes any CAIDA dumps kept in the cache (see importers.get_archived_data())
+        for cache_file in self.cache_path.rglob("*"):
+            try:
+                if cache_file.is_file() and cache_file.stat().st_mtime < oldest:
+                    cache_file.unlink()
+                    pruned += 1
+            except OSError:
+                continue
+        logger.debug(
+            "Pruned HTTP cache", extra={"path": str(self.cache_path), "files": pruned}
+        )
+
+    def get_file_names(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_path / f"{key}.json", self.cache_path / f"{key}.body"
+
+    def load(self, url: str) -> tuple[dict, Path] | tuple[None, None]:
+        meta_file, body_file = self.get_file_names(url)
+        try:
+            with open(meta_file, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        if not body_file.exists():
+            return None, None
+        # Keep the entry from being pruned while it's still being used
+        now = time.time()
+        for cache_file in [meta_file, body_file]:
+            try:
+                os.utime(cache_file, (now, now))
+            except OSError:
+                pass
+        return meta, body_file
+
+    def save(self, url: str, response: Response):
+        meta = {
+            "url": url,
+            "headers": {
+                header: response.headers[header]
+                for header in self.kept_headers
+                if header in response.headers
+            },
+        }
+        meta_file, body_file = self.get_file_names(url)
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        # We write the body before the meta data so a partly written entry is never used
+        partial_body_file = body_file.with_name(f"{body_file.name}.part")
+        with open(partial_body_file, "wb") as f:
+            f.write(response.content)
+        os.replace(partial_body_file, body_file)
+        partial_meta_file = meta_file.with_name(f"{meta_file.name}.part")
+        with open(partial_meta_file, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(partial_meta_file, meta_file)
+
+
+class CachingAdapter(RateLimitedAdapter):
+    """
+    Sends conditional requests for anything we've downloaded before and serves the cached copy if the server says
+    it's not modified. Streamed and ranged requests are passed straight through.
+    """
+
+    def __init__(self, cache: HttpCache, *args, **kwargs):
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: PreparedRequest, *args, **kwargs) -> Response:
+        url = str(request.url)
+        if (
+            request.method != "GET"
+            or kwargs.get("stream")
+            or "Range" in request.headers
+        ):
+            return super().send(request, *args, **kwargs)
+        meta, body_file = self.cache.load(url)
+        if meta is not None:
+            cached_headers = meta.get("headers", {})
+            if "ETag" in cached_headers:
+                request.headers["If-None-Match"] = cached_headers["ETag"]
+            if "Last-Modified" in cached_headers:
+                request.headers["If-Modified-Since"] = cached_headers["Last-Modified"]
+        response = super().send(request, *args, **kwargs)
+        if response.status_code == 304 and meta is not None and body_file is not None:
+            logger.debug("Using cached response", extra={"url": url})
+            return self.build_cached_response(request, meta, body_file)
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            self.cache.save(url, response)
+        return response
+
+    def build_cached_response(
+        self, request: PreparedRequest, meta: dict, body_file: Path
+    ) -> Response:
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = str(request.url)
+        response.request = request
+        response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        with open(body_file, "rb") as f:
+            response._content = f.read()
+        return response
+
+
+def build_session(pool_size: int = 1) -> Session:
+    session = Session()
+    retries = RateLimitedRetry(
+        total=4,
+        backoff_factor=0.5,
+        status_forcelist=[
+            413,
+            429,
+            500,
+            502,
+            503,
+            504,
+        ],  # retry if we receive one of these status codes
+        allowed_methods={"GET"},
+        raise_on_redirect=False,
+        raise_on_status=False,
+    )
+    # The pool needs to be at least as big as the number of workers sharing the session, otherwise urllib3 discards connections
+    adapter_options: dict[str, Any] = {
+        "max_retries": retries,
+        "pool_connections": pool_size,
+        "pool_maxsize": pool_size,
+    }
+    if IXP_TRACKER_HTTP_CACHE_PATH is not None:
+        adapter: HTTPAdapter = CachingAdapter(
+            HttpCache(
+                Path(IXP_TRACKER_HTTP_CACHE_PATH),
+                IXP_TRACKER_HTTP_CACHE_MAX_AGE_DAYS * 24 * 60 * 60,
+            ),
+            **adapter_options,
+        )
+    else:
+        adapter = RateLimitedAdapter(**adapter_options)
+    session.mount("https://", adapter)
+    return session
+
+
+def throttled_seconds() -> float:
+    with rate_limiters_lock:
+        return sum(limiter.throttled_seconds for limiter in rate_limiters.values())
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime, timezone
+
+from ixp_tracker.models import ImportRun
+
+logger = logging.getLogger("ixp_tracker")
+
+
+def get_import_date(processing_date: datetime) -> datetime:
+    # This is the date the events for an import are stored with (see importers.build_app())
+    return processing_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class ImportCheckpoints:
+    """
+    Records the progress of an import in the ledger, so if it fails part way through it can carry on from the last
+    checkpoint rather than starting again. Each stage is recorded once it is complete, as is each IXP during the members
+    stage, as the members take the longest to import.
+    """
+
+    # Each checkpoint during the members stage has to update the projections first, so we only record one after this
+    # many IXPs. The members of any IXPs imported since the last checkpoint are imported again if we resume.
+    ixp_interval = 50
+
+    def __init__(self, run: ImportRun):
+        self.run = run
+        self.ixps_since_checkpoint = 0
+
+    @classmethod
+    def find_resumable(cls, processing_date: datetime) -> "ImportCheckpoints | None":
+        # We can only resume the most recent run, otherwise we'd be adding events before those of a later import
+        latest_run = ImportRun.objects.order_by("-processing_date", "-pk").first()
+        if (
+            latest_run is None
+            or latest_run.finished is not None
+            or latest_run.processing_date != get_import_date(processing_date)
+        ):
+            return None
+        logger.info(
+            "Resuming import",
+            extra={
+                "date": latest_run.processing_date,
+                "stage": ImportRun.Stage(latest_run.stage).label,
+                "last_ixp": latest_run.last_ixp,
+            },
+        )
+        return cls(latest_run)
+
+    @classmethod
+    def start(cls, processing_date: datetime) -> "ImportCheckpoints":
+        return cls(
+            ImportRun.objects.create(processing_date=get_import_date(processing_date))
+        )
+
+    def is_complete(self, stage: ImportRun.Stage) -> bool:
+        return self.run.stage >= stage
+
+    @property
+    def last_ixp(self) -> int | None:
+        return self.run.last_ixp
+
+    def complete_stage(self, stage: ImportRun.Stage, count: int | None = None):
+        self.run.stage = stage
+        if count is not None:
+            self.run.counts[ImportRun.Stage(stage).label] = count
+        self.run.save(update_fields=["stage", "counts", "updated"])
+
+    def is_ixp_checkpoint_due(self) -> bool:
+        """
+        Counts an IXP whose members have been imported, returning True once it's time to record a checkpoint
+        """
+        self.ixps_since_checkpoint += 1
+        return self.ixps_since_checkpoint >= self.ixp_interval
+
+    def complete_ixp(self, peeringdb_id: int):
+        self.run.last_ixp = peeringdb_id
+        self.run.save(update_fields=["last_ixp", "updated"])
+        self.ixps_since_checkpoint = 0
+
+    def finish(self):
+        self.run.stage = ImportRun.Stage.FINISHED
+        self.run.finished = datetime.now(timezone.utc)
+        self.run.save(update_fields=["stage", "finished", "updated"])
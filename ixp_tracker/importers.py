@@ -1,32 +1,64 @@
-import ast
-import json
 import logging
-import os.path
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from json.decoder import JSONDecodeError
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterator, NamedTuple, TypeVar
 
-import requests
+from django.db import connections
 from django_countries import countries
+from requests import Session
 
+from ixp_tracker.archive import (
+    find_archive_file,
+    load_archive_file,
+    load_normalized_archive_file,
+)
+from ixp_tracker.caida import CaidaCatalog, download_dump
 from ixp_tracker.check_org_networks import check_org_networks
 from ixp_tracker.conf import (
-    DATA_ARCHIVE_URL,
+    IXP_TRACKER_HTTP_CACHE_PATH,
     IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH,
+    IXP_TRACKER_LOOKUP_MAX_WORKERS,
+    IXP_TRACKER_PEERING_DB_INCREMENTAL,
+    IXP_TRACKER_SKIP_UNCHANGED_RECORDS,
+    IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE,
 )
 from ixp_tracker.data_lookup import AdditionalDataSources, ASNGeoLookup
-from ixp_tracker.event_store import DjangoEventStore, EventStore, DataAlreadyImported
-from ixp_tracker.gather_data import gather_data, save_data
+from ixp_tracker.event_store import (
+    DataAlreadyImported,
+    DjangoEventStore,
+    EventSequenceConflict,
+    EventStore,
+    EventStorePersistence,
+)
+from ixp_tracker.fingerprints import ImportFingerprints, get_fingerprint
+from ixp_tracker.gather_data import (
+    IMPORT_FIELDS,
+    AllPeeringDbData,
+    gather_data,
+    load_latest_data,
+    save_data,
+    stream_data,
+)
+from ixp_tracker.http import build_session
+from ixp_tracker.import_runs import ImportCheckpoints, get_import_date
 from ixp_tracker.ixp_tracker import (
     IXPTracker,
     MemberImportData,
 )
 from ixp_tracker.ixp_tracker_aggregates import (
+    ASN,
+    IXP,
     IXP_TRACKER_EVENT_MAP,
     NetworkType,
     PeeringPolicy,
     NROStatus,
 )
+from ixp_tracker.models import ASNMap, ImportRun, IXPIdMap
 from ixp_tracker.ixp_tracker_projections import (
     ASNList,
     IXPIdMapProjection,
@@ -34,58 +66,256 @@ from ixp_tracker.ixp_tracker_projections import (
 )
 
 logger = logging.getLogger("ixp_tracker")
+T = TypeVar("T")
 PEERING_DB_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# These are the only PeeringDB collections the import uses
+IMPORTED_COLLECTIONS = ["ix", "net", "netixlan"]
+# The directory in the HTTP cache we download CAIDA dumps to when there is no local archive
+CAIDA_CACHE_DIR = "caida"
+
+
+@dataclass
+class ImportScope:
+    """
+    Restricts an import to the IXPs with the given PeeringDB ids or in the given countries, along with their members
+    and the ASNs of those members. Nothing outside the scope is changed, e.g. IXPs outside the scope are never marked
+    inactive because they aren't in the data being imported. The scope is applied to the data once it has been
+    downloaded, so the full data is still downloaded and archived.
+    """
+
+    peeringdb_ids: set[int] = field(default_factory=set)
+    countries: set[str] = field(default_factory=set)
+
+    def includes(self, peeringdb_id: int, country_code: str) -> bool:
+        return peeringdb_id in self.peeringdb_ids or country_code in self.countries
+
+
+@dataclass
+class MemberShard:
+    """
+    Shard `index` (counting from 1) of `count` shards of IXPs, so the members of different IXPs can be imported by
+    separate processes or machines sharing the same database. Each IXP is a separate aggregate, so shards never store
+    events for the same aggregate. IXPs are split by a stable hash of their PeeringDB id, so an IXP is always in the
+    same shard wherever it is imported.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self):
+        if self.count < 1 or not 1 <= self.index <= self.count:
+            raise ValueError(f"Invalid shard {self.index}/{self.count}")
+
+    def includes(self, peeringdb_id: int) -> bool:
+        return zlib.crc32(str(peeringdb_id).encode()) % self.count == self.index - 1
 
 
 def import_data(
     additional_data: AdditionalDataSources,
     processing_date: datetime | None = None,
     local_archive_path: Path | None = None,
+    scope: ImportScope | None = None,
+    shard: MemberShard | None = None,
+    import_members: bool = True,
+    persistence: EventStorePersistence | None = None,
 ):
-    today = datetime.now(timezone.utc)
-    local_archive_path = local_archive_path or Path(
-        str(IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH)
-    )
     if processing_date is None:
-        processing_date = today
+        processing_date = datetime.now(timezone.utc)
+    all_pdb_data = get_import_data(processing_date, local_archive_path, shard)
+    if all_pdb_data is None:
+        return
+    import_pdb_data(
+        all_pdb_data,
+        additional_data,
+        processing_date,
+        scope,
+        shard,
+        import_members,
+        persistence,
+    )
+
+
+def get_import_data(
+    processing_date: datetime,
+    local_archive_path: Path | None = None,
+    shard: MemberShard | None = None,
+    dry_run: bool = False,
+) -> AllPeeringDbData | dict | None:
+    """
+    Gets the PeeringDB data to import for the processing date. For a dry run we can read the local archive, but we
+    don't add anything to it.
+    """
+    today = datetime.now(timezone.utc)
+    if local_archive_path is None and IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH is not None:
+        local_archive_path = Path(IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH)
+    if shard is not None and processing_date.date() == today.date():
+        # Every shard must import exactly the same data, so they all use the dump saved by the run that imported the
+        # IXPs and ASNs rather than each downloading it again
+        archive_file = (
+            find_archive_file(local_archive_path, processing_date)
+            if local_archive_path is not None
+            else None
+        )
+        if archive_file is None:
+            logger.error(
+                "Cannot find today's PeeringDB data in the local archive",
+                extra={"shard": f"{shard.index}/{shard.count}"},
+            )
+            return None
+        return load_archive_file(archive_file, IMPORTED_COLLECTIONS)
     # If target import date is today it's unlikely CAIDA will have archived the data so we grab it directly from Peering DB
     if processing_date.date() == today.date():
         try:
-            all_pdb_data = gather_data()
-            save_data(all_pdb_data, processing_date, local_archive_path)
+            return get_live_data(processing_date, local_archive_path, dry_run)
         except Exception as e:
             logger.error(
                 "Cannot download latest PeeringDB data", extra={"error": str(e)}
             )
-            return
-    else:
-        all_pdb_data = get_archived_data(processing_date, local_archive_path)
-    es_app = build_app(processing_date)
-    ixp_data = all_pdb_data.get("ix", {"data": []}).get("data", [])
-    asn_data = all_pdb_data.get("net", {"data": []}).get("data", [])
-    org_network_checks = check_org_networks(
-        ixp_data, asn_data, additional_data, processing_date
+            return None
+    return get_archived_data(processing_date, local_archive_path, dry_run=dry_run)
+
+
+def import_pdb_data(
+    all_pdb_data: AllPeeringDbData | dict,
+    additional_data: AdditionalDataSources,
+    processing_date: datetime,
+    scope: ImportScope | None = None,
+    shard: MemberShard | None = None,
+    import_members: bool = True,
+    persistence: EventStorePersistence | None = None,
+):
+    # A scoped import is used to refresh a few IXPs and a shard imports members for IXPs and ASNs that have already been
+    # imported, so both are expected to run for a date that already has data. Anything stored in another persistence
+    # (e.g. in memory for a dry run) doesn't end up in the db, so there's no harm in repeating it either. None of these
+    # can run once a later date has been imported though, as their events would end up before those of the later date.
+    # Only a full import is recorded in the ledger, and it can only be resumed if it didn't finish.
+    is_full_import = scope is None and shard is None and persistence is None
+    checkpoints = (
+        ImportCheckpoints.find_resumable(processing_date) if is_full_import else None
     )
-    process_ixp_data(
-        ixp_data, processing_date, additional_data, es_app, org_network_checks
+    es_app = build_app(
+        processing_date,
+        check_existing_data=checkpoints is None,
+        persistence=persistence,
+        allow_existing_date=not is_full_import,
     )
+    if is_full_import and checkpoints is None:
+        checkpoints = ImportCheckpoints.start(processing_date)
+    ixp_data = all_pdb_data.get("ix", {"data": []}).get("data", [])
+    asn_data = all_pdb_data.get("net", {"data": []}).get("data", [])
+    member_data = all_pdb_data.get("netixlan", {"data": []}).get("data", [])
+    if scope is not None:
+        ixp_data = [
+            ixp for ixp in ixp_data if scope.includes(int(ixp["id"]), ixp["country"])
+        ]
+        scoped_ixp_ids = set([int(ixp["id"]) for ixp in ixp_data])
+        member_data = [m for m in member_data if int(m["ix_id"]) in scoped_ixp_ids]
+        logger.info(
+            "Importing scoped data",
+            extra={"ixps": len(ixp_data), "members": len(member_data)},
+        )
+    if shard is not None:
+        member_data = [m for m in member_data if shard.includes(int(m["ix_id"]))]
+        logger.info(
+            "Importing members for shard",
+            extra={
+                "shard": f"{shard.index}/{shard.count}",
+                "members": len(member_data),
+            },
+        )
+        process_member_data(
+            member_data, processing_date, additional_data, es_app, scope, shard
+        )
+        es_app.finalise()
+        return
+    if checkpoints is None or not checkpoints.is_complete(ImportRun.Stage.IXPS):
+        org_network_checks = check_org_networks(
+            ixp_data, asn_data, additional_data, processing_date
+        )
+        process_ixp_data(
+            ixp_data, processing_date, additional_data, es_app, org_network_checks
+        )
+        complete_stage(es_app, checkpoints, ImportRun.Stage.IXPS, len(ixp_data))
     # This is an optimisation to improve import performance. Peering DB list of networks contains about 2x the number of networks in the member list
     # So, fo now, we choose only to import the ASN data referenced in the member data
-    member_data = all_pdb_data.get("netixlan", {"data": []}).get("data", [])
     member_asns = set([int(m["asn"]) for m in member_data])
     filtered_asn_data = [a for a in asn_data if a["asn"] in member_asns]
-    process_asn_data(filtered_asn_data, processing_date, additional_data, es_app)
-    process_member_data(member_data, processing_date, additional_data, es_app)
+    if checkpoints is None or not checkpoints.is_complete(ImportRun.Stage.ASNS):
+        process_asn_data(filtered_asn_data, processing_date, additional_data, es_app)
+        complete_stage(
+            es_app, checkpoints, ImportRun.Stage.ASNS, len(filtered_asn_data)
+        )
+    if import_members and (
+        checkpoints is None or not checkpoints.is_complete(ImportRun.Stage.MEMBERS)
+    ):
+        process_member_data(
+            member_data,
+            processing_date,
+            additional_data,
+            es_app,
+            scope,
+            checkpoints=checkpoints,
+        )
+        complete_stage(es_app, checkpoints, ImportRun.Stage.MEMBERS, len(member_data))
     es_app.finalise()
+    # If the members are skipped, to be imported in shards, we leave the run open so the date isn't treated as
+    # complete. Running a full import for the date again carries on from the members stage.
+    if checkpoints is not None and import_members:
+        checkpoints.finish()
     logger.debug("Toggled IXPs active status")
 
 
+def complete_stage(
+    es_app: IXPTracker,
+    checkpoints: ImportCheckpoints | None,
+    stage: ImportRun.Stage,
+    count: int,
+):
+    if checkpoints is None:
+        return
+    # The projections have to be up to date with everything imported before the checkpoint, in case we resume from it
+    es_app.finalise()
+    checkpoints.complete_stage(stage, count)
+
+
+def get_live_data(
+    processing_date: datetime, local_archive_path: Path | None, dry_run: bool = False
+) -> AllPeeringDbData:
+    if (
+        not dry_run
+        and IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE
+        and local_archive_path is not None
+        and local_archive_path.is_dir()
+    ):
+        archive_file = stream_data(processing_date, local_archive_path)
+        return load_archive_file(archive_file, IMPORTED_COLLECTIONS)  # type: ignore
+    previous_data, previous_date = (
+        load_latest_data(local_archive_path, processing_date)
+        if IXP_TRACKER_PEERING_DB_INCREMENTAL
+        else (None, None)
+    )
+    all_pdb_data = gather_data(previous_data=previous_data, since=previous_date)
+    if not dry_run:
+        save_data(all_pdb_data, processing_date, local_archive_path)
+    return all_pdb_data
+
+
 def build_app(
     import_date: datetime | None = None,
+    check_existing_data: bool = True,
+    persistence: EventStorePersistence | None = None,
+    allow_existing_date: bool = False,
 ) -> IXPTracker:
-    persistence = DjangoEventStore()
-    if import_date and persistence.has_existing_data(import_date):
-        raise DataAlreadyImported
+    persistence = persistence or DjangoEventStore()
+    if import_date and check_existing_data:
+        # With allow_existing_date we only need to make sure nothing has been imported for a later date
+        check_from = (
+            get_import_date(import_date) + timedelta(days=1)
+            if allow_existing_date
+            else import_date
+        )
+        if persistence.has_existing_data(check_from):
+            raise DataAlreadyImported
     es = EventStore(IXP_TRACKER_EVENT_MAP, persistence)
     app = IXPTracker(es)
     es.add_listener(IXPIdMapProjection())
@@ -94,68 +324,147 @@ def build_app(
     if import_date:
         # We always set the time travel so the monthly stats can run safely for the first of each month,
         # and we set the time elements to zero to ensure we always get all events for that date
-        app.time_travel(import_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        app.time_travel(get_import_date(import_date))
     return app
 
 
-def get_archived_data(processing_date: datetime, local_archive_path: Path | None):
+def get_archived_data(
+    processing_date: datetime,
+    local_archive_path: Path | None,
+    collections: list[str] | None = IMPORTED_COLLECTIONS,
+    dry_run: bool = False,
+):
+    if local_archive_path is None and IXP_TRACKER_HTTP_CACHE_PATH is not None:
+        # Without a local archive we keep the dumps with the HTTP cache, which prunes any that aren't used again
+        return get_archived_data(
+            processing_date,
+            Path(IXP_TRACKER_HTTP_CACHE_PATH) / CAIDA_CACHE_DIR,
+            collections,
+        )
+    if local_archive_path is None:
+        # Without a local archive or an HTTP cache we download to a temporary directory, so we can always read the
+        # dump from disk, but it has to be downloaded again every time
+        with TemporaryDirectory() as temp_archive_path:
+            return get_archived_data(
+                processing_date, Path(temp_archive_path), collections
+            )
+    if dry_run:
+        # A dry run can use a dump that's already in the local archive, but anything it downloads (and the normalized
+        # copy of the dump) goes in a temporary directory instead
+        with TemporaryDirectory() as temp_download_path:
+            archive_file_name = prefetch_archived_data(
+                processing_date,
+                local_archive_path,
+                download_path=Path(temp_download_path),
+            )
+            return read_archived_data(
+                processing_date, archive_file_name, collections, normalize=False
+            )
+    archive_file_name = prefetch_archived_data(processing_date, local_archive_path)
+    return read_archived_data(processing_date, archive_file_name, collections)
+
+
+def read_archived_data(
+    processing_date: datetime,
+    archive_file_name: Path | None,
+    collections: list[str] | None,
+    normalize: bool = True,
+):
+    if archive_file_name is None:
+        logger.warning(
+            "Cannot find backfill data", extra={"backfill_date": processing_date}
+        )
+        return
+    try:
+        if collections is None or not normalize:
+            return load_archive_file(archive_file_name, collections)
+        return load_normalized_archive_file(
+            archive_file_name,
+            {collection: IMPORT_FIELDS.get(collection) for collection in collections},
+        )
+    except (ValueError, SyntaxError) as e:
+        logger.warning(
+            "Cannot read archive file",
+            extra={"archive_file": str(archive_file_name), "error": str(e)},
+        )
+        return
+
+
+def prefetch_archived_data(
+    processing_date: datetime,
+    local_archive_path: Path,
+    caida_session: Session | None = None,
+    caida_catalog: CaidaCatalog | None = None,
+    download_path: Path | None = None,
+) -> Path | None:
+    """
+    Makes sure the most recent dump on or before the processing date is in the local archive, downloading it from
+    CAIDA if needed, and returns its file name. Use `download_path` to download (and save the catalog) somewhere
+    other than the local archive.
+    """
+    download_path = download_path or local_archive_path
     # There is a gap in the CAIDA archive between 2020-01-20 and 2020-02-10 so we need to check back for
     # at least 15 days to ensure we get the most recent archived data
     oldest_archive_date = processing_date - timedelta(days=15)
-    backfill_raw = None
-    found = False
-    needs_save = False
-    while processing_date.date() >= oldest_archive_date.date() and not found:
-        archive_file_name = f"{local_archive_path}/{processing_date.year}{processing_date.month:02}{processing_date.day:02}.peeringdb_2_dump.json"
+    caida_session = caida_session or build_session()
+    caida_catalog = caida_catalog or CaidaCatalog(download_path, caida_session)
+    while processing_date.date() >= oldest_archive_date.date():
         logger.debug(
             "Searching for archive file locally",
-            extra={"search_path": archive_file_name},
+            extra={"search_path": str(local_archive_path), "date": processing_date},
         )
-        if os.path.exists(archive_file_name):
-            with open(archive_file_name) as f:
-                backfill_raw = f.read()
-                found = True
-                logger.debug(
-                    "Found archive file locally",
-                    extra={
-                        "archive_file": archive_file_name,
-                        "processing_date": processing_date,
-                    },
-                )
-            continue
-        logger.debug(
-            "Checking CAIDA for archived data",
-            extra={"processing_date": processing_date},
-        )
-        url = DATA_ARCHIVE_URL.format(
-            year=processing_date.year,
-            month=processing_date.month,
-            day=processing_date.day,
-        )
-        data = requests.get(url)
-        if data.status_code == 200:
-            found = True
-            backfill_raw = data.text
+        archive_file_name = find_archive_file(local_archive_path, processing_date)
+        if archive_file_name is not None:
+            logger.debug(
+                "Found archive file locally",
+                extra={
+                    "archive_file": str(archive_file_name),
+                    "processing_date": processing_date,
+                },
+            )
+            return archive_file_name
+        if caida_catalog.has_dump(processing_date) is not False:
             logger.debug(
-                "Retrieved archive file from CAIDA",
+                "Checking CAIDA for archived data",
                 extra={"processing_date": processing_date},
             )
-            needs_save = True
-            continue
+            download_path.mkdir(parents=True, exist_ok=True)
+            archive_file_name = download_dump(
+                processing_date, download_path, caida_session
+            )
+            if archive_file_name is not None:
+                return archive_file_name
         processing_date = processing_date - timedelta(days=1)
-    if not found or not backfill_raw:
-        logger.warning(
-            "Cannot find backfill data", extra={"backfill_date": processing_date}
-        )
+    return None
+
+
+def get_archived_months(
+    months: list[datetime], local_archive_path: Path | None
+) -> Iterator[tuple[datetime, dict | None]]:
+    """
+    Yields the archived data for each month in turn. While the caller is importing one month, the next one is
+    downloaded and parsed in the background so the import doesn't have to wait for it.
+    """
+    if len(months) == 0:
         return
-    try:
-        all_pdb_data = json.loads(backfill_raw)
-    except JSONDecodeError:
-        # It seems some of the Peering dumps use single quotes so try and load using ast in this case
-        all_pdb_data = ast.literal_eval(backfill_raw)
-    if needs_save:
-        save_data(all_pdb_data, processing_date, local_archive_path)
-    return all_pdb_data
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_month = executor.submit(get_archived_data, months[0], local_archive_path)
+        for index, month in enumerate(months):
+            all_pdb_data = next_month.result()
+            if index + 1 < len(months):
+                next_month = executor.submit(
+                    get_archived_data, months[index + 1], local_archive_path
+                )
+            yield month, all_pdb_data
+
+
+def get_months(first_month: datetime, last_month: datetime) -> list[datetime]:
+    months = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
 
 
 def process_ixp_data(
@@ -169,8 +478,17 @@ def process_ixp_data(
     # We currently rely on an external lookup that cross-references RIPE ATLAS data against PeeringDB
     # Perhaps we could do some or all of that processing here in the future.
     anchor_hosts = data_lookup.get_atlas_anchor_hosts(processing_date)
+    fingerprints = (
+        ImportFingerprints(IXP.__name__) if IXP_TRACKER_SKIP_UNCHANGED_RECORDS else None
+    )
+    ixp_aggregate_ids = (
+        dict(IXPIdMap.objects.values_list("peeringdb_id", "aggregate_id"))
+        if fingerprints is not None
+        else {}
+    )
     ixps_added = 0
     ixps_updated = 0
+    ixps_unchanged = 0
     for ixp_data in all_ixp_data:
         country_data = countries.alpha2(ixp_data["country"])
         if len(country_data) == 0:
@@ -181,6 +499,30 @@ def process_ixp_data(
             continue
         try:
             peeringdb_id = int(ixp_data["id"])
+            org_network_active = org_network_checks.get(peeringdb_id)
+            manrs_participant = ixp_data["id"] in manrs_participants
+            anchor_host = ixp_data["id"] in anchor_hosts
+            fingerprint = get_fingerprint(
+                [ixp_data.get(field) for field in IMPORT_FIELDS["ix"] or []],
+                org_network_active,
+                manrs_participant,
+                anchor_host,
+            )
+            aggregate_id = ixp_aggregate_ids.get(peeringdb_id)
+            if (
+                fingerprints is not None
+                and aggregate_id is not None
+                and fingerprints.is_unchanged(peeringdb_id, fingerprint)
+            ):
+                # Nothing has changed since the last import so all we need to record is that the IXP is still active
+                import_with_retry(
+                    lambda: event_sourcing_app.mark_ixp_active(
+                        aggregate_id, processing_date
+                    ),
+                    {"ixp": peeringdb_id},
+                )
+                ixps_unchanged += 1
+                continue
             date_created = datetime.strptime(
                 ixp_data["created"], PEERING_DB_DATE_FORMAT
             ).replace(tzinfo=timezone.utc)
@@ -192,33 +534,44 @@ def process_ixp_data(
                 if ixp_data.get("fac_count") is not None
                 else None
             )
-            _ixp = event_sourcing_app.import_ixp(
-                ixp_data["name"],
-                ixp_data["name_long"],
-                ixp_data["city"],
-                peeringdb_id,
-                ixp_data["website"],
-                ixp_data["country"],
-                date_created,
-                last_updated,
-                processing_date,
-                org_network_checks.get(peeringdb_id),
-                ixp_data["id"] in manrs_participants,
-                ixp_data["id"] in anchor_hosts,
-                int(ixp_data["org_id"]),
-                physical_locations,
+            import_with_retry(
+                lambda: event_sourcing_app.import_ixp(
+                    ixp_data["name"],
+                    ixp_data["name_long"],
+                    ixp_data["city"],
+                    peeringdb_id,
+                    ixp_data["website"],
+                    ixp_data["country"],
+                    date_created,
+                    last_updated,
+                    processing_date,
+                    org_network_active,
+                    manrs_participant,
+                    anchor_host,
+                    int(ixp_data["org_id"]),
+                    physical_locations,
+                ),
+                {"ixp": peeringdb_id},
             )
             logger.debug(
                 "Importing IXP record from Peering Db",
                 extra={"id": ixp_data["id"]},
             )
             ixps_updated += 1
+            if fingerprints is not None:
+                fingerprints.update(peeringdb_id, fingerprint)
 
         except Exception as e:
             logger.warning("Cannot import IXP data", extra={"error": str(e)})
+    if fingerprints is not None:
+        fingerprints.save()
     logger.info(
         "Processed IXP data",
-        extra={"added": ixps_added, "updated": ixps_updated},
+        extra={
+            "added": ixps_added,
+            "updated": ixps_updated,
+            "unchanged": ixps_unchanged,
+        },
     )
 
 
@@ -228,17 +581,21 @@ def process_asn_data(
     geo_lookup: AdditionalDataSources,
     event_sourcing_app: IXPTracker,
 ):
-    for asn_data in all_asn_data:
+    fingerprints = (
+        ImportFingerprints(ASN.__name__) if IXP_TRACKER_SKIP_UNCHANGED_RECORDS else None
+    )
+    known_asns = (
+        set(ASNMap.objects.values_list("asn", flat=True))
+        if fingerprints is not None
+        else set()
+    )
+    all_lookups = get_asn_lookups(all_asn_data, processing_date, geo_lookup)
+    for asn_data, lookups in zip(all_asn_data, all_lookups):
         try:
+            if isinstance(lookups, Exception):
+                raise lookups
             asn = int(asn_data["asn"])
-            country_code = geo_lookup.get_iso2_country(asn, processing_date)
-            routed_asns = geo_lookup.get_routed_asns_for_country(
-                country_code, processing_date
-            )
-            try:
-                nro_status = NROStatus(geo_lookup.get_status(asn, processing_date))
-            except ValueError:
-                nro_status = NROStatus.UNKNOWN
+            country_code, is_routed, nro_status, customer_asns = lookups
             try:
                 network_type = NetworkType(asn_data["info_type"])
             except ValueError:
@@ -247,7 +604,7 @@ def process_asn_data(
                 peering_policy = PeeringPolicy(asn_data["policy_general"])
             except ValueError:
                 peering_policy = PeeringPolicy.UNKNOWN
-            event_sourcing_app.import_asn(
+            fingerprint = get_fingerprint(
                 asn,
                 asn_data["name"],
                 network_type,
@@ -255,23 +612,112 @@ def process_asn_data(
                 asn_data["id"],
                 country_code,
                 nro_status,
-                asn in routed_asns,
-                geo_lookup.get_customer_asns([asn], processing_date),
+                is_routed,
+                customer_asns,
+            )
+            if (
+                fingerprints is not None
+                and asn in known_asns
+                and fingerprints.is_unchanged(asn, fingerprint)
+            ):
+                # The ASN would be imported with exactly the same values as last time, so there are no events to store
+                continue
+            import_with_retry(
+                lambda: event_sourcing_app.import_asn(
+                    asn,
+                    asn_data["name"],
+                    network_type,
+                    peering_policy,
+                    asn_data["id"],
+                    country_code,
+                    nro_status,
+                    is_routed,
+                    customer_asns,
+                ),
+                {"asn": asn},
             )
+            if fingerprints is not None:
+                fingerprints.update(asn, fingerprint)
 
         except Exception as e:
             logger.warning("Cannot import ASN data", extra={"error": str(e)})
+    if fingerprints is not None:
+        fingerprints.save()
     return True
 
 
+def import_with_retry(import_record: Callable[[], T], log_data: dict) -> T:
+    """
+    Runs an import that loads the aggregate itself. If something else stores events for the aggregate while we're
+    importing it, the events we worked out are out of date, so we run the import again from the latest version.
+    """
+    try:
+        return import_record()
+    except EventSequenceConflict:
+        logger.debug("Reloading aggregate", extra=log_data)
+        return import_record()
+
+
+class ASNLookups(NamedTuple):
+    country_code: str
+    is_routed: bool
+    nro_status: NROStatus
+    customer_asns: list[int]
+
+
+def lookup_asn(
+    asn_data, processing_date: datetime, geo_lookup: AdditionalDataSources
+) -> ASNLookups:
+    asn = int(asn_data["asn"])
+    country_code = geo_lookup.get_iso2_country(asn, processing_date)
+    routed_asns = geo_lookup.get_routed_asns_for_country(country_code, processing_date)
+    try:
+        nro_status = NROStatus(geo_lookup.get_status(asn, processing_date))
+    except ValueError:
+        nro_status = NROStatus.UNKNOWN
+    customer_asns = geo_lookup.get_customer_asns([asn], processing_date)
+    return ASNLookups(country_code, asn in routed_asns, nro_status, customer_asns)
+
+
+def get_asn_lookups(
+    all_asn_data, processing_date: datetime, geo_lookup: AdditionalDataSources
+) -> list[ASNLookups | Exception]:
+    """
+    Runs the additional data source lookups for every ASN before any events are stored, so slow lookups can be made
+    at the same time. Results are returned in the same order as the data, with the exception in place of the results
+    for any ASN whose lookups failed.
+    """
+
+    def try_lookup_asn(asn_data) -> ASNLookups | Exception:
+        try:
+            return lookup_asn(asn_data, processing_date, geo_lookup)
+        except Exception as e:
+            return e
+
+    def try_lookup_asn_in_worker(asn_data) -> ASNLookups | Exception:
+        try:
+            return try_lookup_asn(asn_data)
+        finally:
+            # Lookups that use the db open a connection for the worker thread, which Django won't close for us
+            connections.close_all()
+
+    if IXP_TRACKER_LOOKUP_MAX_WORKERS == 1:
+        return [try_lookup_asn(asn_data) for asn_data in all_asn_data]
+    with ThreadPoolExecutor(max_workers=IXP_TRACKER_LOOKUP_MAX_WORKERS) as executor:
+        return list(executor.map(try_lookup_asn_in_worker, all_asn_data))
+
+
 def process_member_data(
     all_member_data,
     processing_date: datetime,
     geo_lookup: ASNGeoLookup,
     event_sourcing_app: IXPTracker,
+    scope: ImportScope | None = None,
+    shard: MemberShard | None = None,
+    checkpoints: ImportCheckpoints | None = None,
 ):
     all_member_data = dedupe_member_data(all_member_data)
-    ixp_member_data: dict[int, list[MemberImportData]] = {}
+    ixp_member_data: defaultdict[int, list[MemberImportData]] = defaultdict(list)
     for member_data in all_member_data:
         asn = int(member_data["asn"])
         created_date = datetime.strptime(
@@ -290,49 +736,76 @@ def process_member_data(
             "is_rs_peer": is_rs_peer,
             "port_speed": port_speed,
         }
-        seen = ixp_member_data.get(ix_id)
-        if not seen:
-            ixp_member_data[ix_id] = [import_data]
-        else:
-            ixp_member_data[ix_id] += [import_data]
+        ixp_member_data[ix_id].append(import_data)
     ixps = event_sourcing_app.get_all_ixps()
-    updated = []
-    for peeringdb_id in ixp_member_data:
+    ixps_by_peeringdb_id = {ixp.peeringdb_id: ixp for ixp in ixps}
+    updated = set()
+    last_ixp = checkpoints.last_ixp if checkpoints is not None else None
+    # IXPs are imported in order of their PeeringDB id so an interrupted import can carry on after the last one completed
+    for peeringdb_id in sorted(ixp_member_data):
+        if last_ixp is not None and peeringdb_id <= last_ixp:
+            completed_ixp = ixps_by_peeringdb_id.get(peeringdb_id)
+            if completed_ixp is not None:
+                updated.add(completed_ixp.id)
+            continue
         try:
             log_data = {"ixp": peeringdb_id}
             logger.debug("Importing IXP members", extra=log_data)
-            ixp = next((ixp for ixp in ixps if ixp.peeringdb_id == peeringdb_id), None)
+            ixp = ixps_by_peeringdb_id.get(peeringdb_id)
             if ixp is None:
                 logger.warning("Cannot find IXP", extra=log_data)
                 continue
-            ixp = event_sourcing_app.import_members(
-                ixp, ixp_member_data[peeringdb_id], processing_date
-            )
+            try:
+                ixp = event_sourcing_app.import_members(
+                    ixp, ixp_member_data[peeringdb_id], processing_date
+                )
+            except EventSequenceConflict:
+                # Something else has stored events for the IXP since we loaded it, so we work out its events again
+                logger.debug("Reloading IXP", extra=log_data)
+                ixp = event_sourcing_app.import_members(
+                    event_sourcing_app.find_by_peeringdb_id(peeringdb_id) or ixp,
+                    ixp_member_data[peeringdb_id],
+                    processing_date,
+                )
             log_data["member_count"] = len(ixp.get_members(True))
-            updated.append(ixp.id)
+            updated.add(ixp.id)
             logger.debug("Imported IXP members", extra=log_data)
         except Exception as e:
             logger.warning(
                 "Cannot import IXP members",
                 extra={"ixp": peeringdb_id, "error": str(e)},
             )
+        if checkpoints is not None and checkpoints.is_ixp_checkpoint_due():
+            event_sourcing_app.finalise()
+            checkpoints.complete_ixp(peeringdb_id)
     for ixp in ixps:
         if ixp.id in updated:
             continue
+        if scope is not None and not scope.includes(ixp.peeringdb_id, ixp.country_code):
+            continue
+        if shard is not None and not shard.includes(ixp.peeringdb_id):
+            continue
         logger.debug("Marking IXP members inactive", extra={"ixp_id": ixp.peeringdb_id})
         event_sourcing_app.check_ixp_inactive(ixp, processing_date)
     logger.info("Fixing members finished")
 
 
 def dedupe_member_data(raw_members_data):
-    deduped_data = {}
+    """
+    Merges the records for an ASN that has more than one connection to an IXP. Records are only copied when they
+    have a duplicate, so the (unmodified) raw data is passed through for everything else.
+    """
+    deduped_data: dict[tuple[int, int], dict] = {}
+    merged_keys: set[tuple[int, int]] = set()
     for raw_member in raw_members_data:
-        member_key = str(raw_member["ix_id"]) + "-" + str(raw_member["asn"])
-        if deduped_data.get(member_key) is None:
-            deduped_data[member_key] = dict(raw_member)
-        else:
-            deduped_data[member_key]["is_rs_peer"] = (
-                deduped_data[member_key]["is_rs_peer"] or raw_member["is_rs_peer"]
-            )
-            deduped_data[member_key]["speed"] += raw_member["speed"]
+        member_key = (int(raw_member["ix_id"]), int(raw_member["asn"]))
+        member = deduped_data.get(member_key)
+        if member is None:
+            deduped_data[member_key] = raw_member
+            continue
+        if member_key not in merged_keys:
+            member = deduped_data[member_key] = dict(member)
+            merged_keys.add(member_key)
+        member["is_rs_peer"] = member["is_rs_peer"] or raw_member["is_rs_peer"]
+        member["speed"] += raw_member["speed"]
     return list(deduped_data.values())
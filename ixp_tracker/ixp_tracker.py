@@ -6,6 +6,7 @@ from uuid import uuid4, UUID
 from ixp_tracker.event_store import (
     EventStore,
     AggregateNotFound,
+    DomainEvent,
 )
 import ixp_tracker.ixp_tracker_aggregates as ixpt
 from ixp_tracker.ixp_tracker_aggregates import NROStatus
@@ -87,6 +88,17 @@ class IXPTracker(ASNLookup):
         ixp = self.es.store(ixp, event)
         return ixp
 
+    def mark_ixp_active(self, aggregate_id: UUID, last_active: datetime) -> ixpt.IXP:
+        """
+        Stores the IXPActiveInPeeringDb event without comparing the IXP data, for when we already know nothing else
+        about the IXP has changed. We still load the IXP (from its snapshot) so listeners get its full state.
+        """
+        ixp = self.es.get_aggregate(aggregate_id, ixpt.IXP)
+        active_event = ixpt.IXPActiveInPeeringDb(
+            last_active=stringify_date(last_active)
+        )
+        return self.es.store(ixp, active_event)
+
     def _update_ixp(
         self,
         ixp: ixpt.IXP,
@@ -212,6 +224,8 @@ class IXPTracker(ASNLookup):
         processing_date: datetime,
     ) -> ixpt.IXP:
         existing_members = ixp.get_members(True)
+        # None of the events depend on the ones before, so they are all stored in one go
+        events: list[DomainEvent] = []
         for member in ixp_data:
             as_entity = self.get_asn(member["asn"])
             if as_entity is None:
@@ -241,23 +255,24 @@ class IXPTracker(ASNLookup):
                     member["is_rs_peer"],
                     member["port_speed"],
                 )
-                ixp = self.es.store(ixp, join_event)
+                events.append(join_event)
             else:
                 if member["port_speed"] != existing_member.port_speed:
                     update_event = ixpt.PortSpeedUpdated(
                         member["asn"], member["port_speed"], date_updated
                     )
-                    ixp = self.es.store(ixp, update_event)
+                    events.append(update_event)
                 if member["is_rs_peer"] != existing_member.is_rs_peer:
                     rs_peer_event = ixpt.RsPeeringStatusChange(
                         member["asn"], member["is_rs_peer"], date_updated
                     )
-                    ixp = self.es.store(ixp, rs_peer_event)
+                    events.append(rs_peer_event)
                 active_event = ixpt.IXPMemberActiveInPeeringDb(
                     member["asn"], stringify_date(processing_date)
                 )
-                ixp = self.es.store(ixp, active_event)
+                events.append(active_event)
 
+        ixp = self.es.append(ixp, events, ixp.sequence)
         ixp = self.check_ixp_inactive(ixp, processing_date)
         self.es.save_snapshot(ixp)
         return ixp
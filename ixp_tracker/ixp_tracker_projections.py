@@ -130,6 +130,8 @@ class IXPsLastUpdatedProjection(Projection):
                     "data": snapshot,
                 },
             )
+        # Finalise can be called more than once in an import (e.g. at each checkpoint), so we only write each IXP once
+        self.ixps_to_update = {}
 
     def reset(self):
         UpdatedIXPs.objects.all().delete()
@@ -1,7 +1,18 @@
 import dataclasses
+import json
 from datetime import datetime, timezone
 from enum import Enum
 from json import JSONEncoder
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+
+from ixp_tracker.conf import IXP_TRACKER_JSON_CODEC
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
 
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S%z"
 
@@ -25,3 +36,23 @@ def stringify_date(date_value: datetime) -> str:
 
 def dateify_string(string_value: str) -> datetime:
     return datetime.strptime(string_value, DATE_FORMAT)
+
+
+def get_json_codec() -> str:
+    if IXP_TRACKER_JSON_CODEC == "auto":
+        return "json" if orjson is None else "orjson"
+    if IXP_TRACKER_JSON_CODEC == "orjson" and orjson is None:
+        raise ImproperlyConfigured(
+            "IXP_TRACKER_JSON_CODEC is 'orjson' but orjson is not installed"
+        )
+    return IXP_TRACKER_JSON_CODEC
+
+
+def decode_json(buffer: bytes | memoryview) -> Any:
+    """
+    Raises json.JSONDecodeError if the buffer can't be decoded, whichever codec is used
+    """
+    if get_json_codec() == "orjson":
+        return orjson.loads(buffer)
+    # The standard library can't decode a memoryview, so we need a copy
+    return json.loads(bytes(buffer))
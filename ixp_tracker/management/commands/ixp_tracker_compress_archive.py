@@ -0,0 +1,66 @@
+import logging
+import traceback
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from ixp_tracker.archive import (
+    COMPRESSION_SUFFIXES,
+    compress_archive_file,
+    get_compression,
+    list_archive_files,
+)
+from ixp_tracker.conf import (
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION,
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH,
+)
+
+logger = logging.getLogger("ixp_tracker")
+
+
+class Command(BaseCommand):
+    help = "Converts the files in the local data archive to a different compression"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compression",
+            type=str,
+            choices=[c for c in COMPRESSION_SUFFIXES.keys() if c is not None]
+            + ["none"],
+            default=IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION or "gzip",
+            help="The compression to convert the archive files to",
+        )
+        parser.add_argument(
+            "--path",
+            type=str,
+            default=IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH,
+            help="The archive directory, if different to IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] is None:
+                logging.error("No local data archive path set")
+                return
+            compression = (
+                None if options["compression"] == "none" else options["compression"]
+            )
+            archive_files = list_archive_files(Path(options["path"]))
+            converted = 0
+            for _, archive_file in archive_files:
+                if get_compression(archive_file) == compression:
+                    continue
+                logger.debug(
+                    "Converting archive file", extra={"archive_file": str(archive_file)}
+                )
+                compress_archive_file(archive_file, compression)
+                converted += 1
+            logger.info(
+                "Archive conversion finished",
+                extra={"converted": converted, "total": len(archive_files)},
+            )
+        except Exception as e:
+            logging.error(
+                "Failed to convert archive",
+                extra={"error": str(e), "trace": traceback.format_exc()},
+            )
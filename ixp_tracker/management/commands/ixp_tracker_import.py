@@ -1,16 +1,33 @@
+import argparse
 import logging
 import traceback
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
+from pathlib import Path
 
 from django.core.management import BaseCommand
+from django.db import transaction
 
-from ixp_tracker.conf import IXP_TRACKER_DATA_LOOKUP_FACTORY
+from ixp_tracker.conf import (
+    IXP_TRACKER_DATA_LOOKUP_FACTORY,
+    IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH,
+)
 from ixp_tracker.data_lookup import (
     AdditionalDataSources,
     DefaultAdditionalDataSources,
     load_lookup,
 )
-from ixp_tracker.importers import import_data
+from ixp_tracker.event_store import InMemoryEventStore
+from ixp_tracker.importers import (
+    ImportScope,
+    MemberShard,
+    get_archived_months,
+    get_import_data,
+    get_months,
+    import_data,
+    import_pdb_data,
+)
+from ixp_tracker.models import StoredEvent
 from ixp_tracker.stats import generate_stats
 
 logger = logging.getLogger("ixp_tracker")
@@ -32,8 +49,59 @@ class Command(BaseCommand):
             default=None,
             help="The month you would like to backfill data for",
         )
+        parser.add_argument(
+            "--backfill-from",
+            type=str,
+            default=None,
+            help="The first month of a range of months you would like to backfill data for",
+        )
+        parser.add_argument(
+            "--backfill-to",
+            type=str,
+            default=None,
+            help="The last month of a range of months you would like to backfill data for",
+        )
+        parser.add_argument(
+            "--ixp",
+            type=int,
+            action="append",
+            default=None,
+            help="Only import the IXP with this PeeringDB id (can be given more than once)",
+        )
+        parser.add_argument(
+            "--country",
+            type=str,
+            action="append",
+            default=None,
+            help="Only import the IXPs in this country (can be given more than once)",
+        )
+        parser.add_argument(
+            "--skip-members",
+            action="store_true",
+            default=False,
+            help="Import the IXPs and ASNs but leave the members to be imported in shards",
+        )
+        parser.add_argument(
+            "--shard",
+            type=parse_shard,
+            default=None,
+            help="Only import the members of the IXPs in this shard, given as i/n, e.g. 1/4",
+        )
+        parser.add_argument(
+            "--stats-only",
+            action="store_true",
+            default=False,
+            help="Only generate the stats, once all the shards have been imported",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Run the import and report the events it would store, without saving anything",
+        )
 
     def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
         try:
             logger.debug("Importing IXP data")
             data_lookup: AdditionalDataSources = (
@@ -42,18 +110,58 @@ class Command(BaseCommand):
             )
             reset = options["reset_asns"]
             backfill_date = options["backfill"]
-            processing_date = None
-            if backfill_date is None:
-                import_data(data_lookup, reset)
-            else:
-                processing_date = datetime.strptime(backfill_date, "%Y%m").replace(
-                    tzinfo=timezone.utc
+            scope = get_scope(options["ixp"], options["country"])
+            shard = options["shard"]
+            skip_members = options["skip_members"]
+            if (
+                options["backfill_from"] is not None
+                or options["backfill_to"] is not None
+            ):
+                if shard is not None or skip_members or options["stats_only"]:
+                    logger.error(
+                        "Sharded imports can only be run for a single month at a time"
+                    )
+                    return
+                if options["dry_run"]:
+                    logger.error(
+                        "Dry runs can only be run for a single month at a time"
+                    )
+                    return
+                if reset:
+                    logger.warning(
+                        "The --reset option has no effect when running a backfill"
+                    )
+                self.backfill_months(
+                    data_lookup,
+                    parse_month(options["backfill_from"] or options["backfill_to"]),
+                    parse_month(options["backfill_to"] or options["backfill_from"]),
+                    scope,
                 )
+                return
+            processing_date = None
+            if backfill_date is not None:
+                processing_date = parse_month(backfill_date)
                 if reset:
                     logger.warning(
                         "The --reset option has no effect when running a backfill"
                     )
-                import_data(data_lookup, False, processing_date)
+            if options["dry_run"]:
+                self.dry_run(
+                    data_lookup, processing_date, scope, shard, not skip_members
+                )
+                return
+            if not options["stats_only"]:
+                import_data(
+                    data_lookup,
+                    processing_date,
+                    scope=scope,
+                    shard=shard,
+                    import_members=not skip_members,
+                )
+                if shard is not None or skip_members:
+                    # The stats need every member, so they are generated separately once all the shards are imported
+                    logger.info("Import finished")
+                    return
 
             logger.debug("Generating stats")
             generate_stats(data_lookup, processing_date)
@@ -63,3 +171,103 @@ class Command(BaseCommand):
                 "Failed to import data",
                 extra={"error": str(e), "trace": traceback.format_exc()},
             )
+
+    def dry_run(
+        self,
+        data_lookup: AdditionalDataSources,
+        processing_date: datetime | None,
+        scope: ImportScope | None,
+        shard: MemberShard | None,
+        import_members: bool,
+    ):
+        if processing_date is None:
+            processing_date = datetime.now(timezone.utc)
+        # We get the data before starting the transaction, so it isn't held open while we download
+        all_pdb_data = get_import_data(processing_date, shard=shard, dry_run=True)
+        if all_pdb_data is None:
+            return
+        with transaction.atomic():
+            persistence = InMemoryEventStore.from_db()
+            import_pdb_data(
+                all_pdb_data,
+                data_lookup,
+                processing_date,
+                scope,
+                shard,
+                import_members,
+                persistence,
+            )
+            # The projections and fingerprints are still saved as the import goes along, so we throw those away too
+            transaction.set_rollback(True)
+        self.report_events(persistence.new_events)
+        logger.info("Dry run finished", extra={"events": len(persistence.new_events)})
+
+    def report_events(self, events: list[StoredEvent]):
+        event_counts: dict[str, Counter] = defaultdict(Counter)
+        aggregates: dict[str, set] = defaultdict(set)
+        aggregate_events: dict[tuple[str, str], list[str]] = defaultdict(list)
+        for event in events:
+            event_counts[event.aggregate_type][event.event_type] += 1
+            aggregates[event.aggregate_type].add(event.aggregate_id)
+            aggregate_events[(event.aggregate_type, str(event.aggregate_id))].append(
+                event.event_type
+            )
+        self.stdout.write(f"{len(events)} events would be stored")
+        for aggregate_type in sorted(event_counts.keys()):
+            self.stdout.write(
+                f"{aggregate_type}: {len(aggregates[aggregate_type])} aggregates"
+            )
+            for event_type, count in sorted(event_counts[aggregate_type].items()):
+                self.stdout.write(f"  {event_type}: {count}")
+        if self.verbosity > 1:
+            for aggregate_type, aggregate_id in sorted(aggregate_events.keys()):
+                event_types = aggregate_events[(aggregate_type, aggregate_id)]
+                self.stdout.write(
+                    f"{aggregate_type} {aggregate_id}: {', '.join(event_types)}"
+                )
+
+    def backfill_months(
+        self,
+        data_lookup: AdditionalDataSources,
+        first_month: datetime,
+        last_month: datetime,
+        scope: ImportScope | None = None,
+    ):
+        local_archive_path = (
+            Path(IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH)
+            if IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH is not None
+            else None
+        )
+        months = get_months(first_month, last_month)
+        for processing_date, all_pdb_data in get_archived_months(
+            months, local_archive_path
+        ):
+            if all_pdb_data is None:
+                continue
+            logger.debug("Importing IXP data", extra={"month": processing_date})
+            import_pdb_data(all_pdb_data, data_lookup, processing_date, scope)
+            logger.debug("Generating stats", extra={"month": processing_date})
+            generate_stats(data_lookup, processing_date)
+        logger.info("Backfill finished", extra={"months": len(months)})
+
+
+def parse_month(month: str) -> datetime:
+    return datetime.strptime(month, "%Y%m").replace(tzinfo=timezone.utc)
+
+
+def parse_shard(shard: str) -> MemberShard:
+    try:
+        index, count = shard.split("/")
+        return MemberShard(int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard: {shard}")
+
+
+def get_scope(
+    peeringdb_ids: list[int] | None, countries: list[str] | None
+) -> ImportScope | None:
+    if not peeringdb_ids and not countries:
+        return None
+    return ImportScope(
+        set(peeringdb_ids or []), set([country.upper() for country in countries or []])
+    )
@@ -0,0 +1,89 @@
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from ixp_tracker.caida import CaidaCatalog
+from ixp_tracker.conf import IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH
+from ixp_tracker.http import build_session
+from ixp_tracker.importers import get_months, prefetch_archived_data
+
+logger = logging.getLogger("ixp_tracker")
+
+
+class Command(BaseCommand):
+    help = "Downloads the archived data for a range of months into the local data archive, ready to backfill"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            type=str,
+            required=True,
+            dest="first_month",
+            help="The first month to download data for (YYYYMM)",
+        )
+        parser.add_argument(
+            "--to",
+            type=str,
+            required=True,
+            dest="last_month",
+            help="The last month to download data for (YYYYMM)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="The maximum number of months to download at the same time",
+        )
+        parser.add_argument(
+            "--path",
+            type=str,
+            default=IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH,
+            help="The archive directory, if different to IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] is None:
+                logging.error("No local data archive path set")
+                return
+            archive_path = Path(options["path"])
+            archive_path.mkdir(parents=True, exist_ok=True)
+            months = get_months(
+                datetime.strptime(options["first_month"], "%Y%m").replace(
+                    tzinfo=timezone.utc
+                ),
+                datetime.strptime(options["last_month"], "%Y%m").replace(
+                    tzinfo=timezone.utc
+                ),
+            )
+            workers = max(1, options["workers"])
+            # All the workers share one session and catalog so they use the same connection pool and rate limit
+            session = build_session(workers)
+            catalog = CaidaCatalog(archive_path, session)
+
+            def prefetch_month(month: datetime) -> Path | None:
+                archive_file = prefetch_archived_data(
+                    month, archive_path, session, catalog
+                )
+                if archive_file is None:
+                    logger.warning("Cannot find archived data", extra={"month": month})
+                return archive_file
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                archive_files = list(executor.map(prefetch_month, months))
+            logger.info(
+                "Prefetch finished",
+                extra={
+                    "months": len(months),
+                    "found": len([f for f in archive_files if f is not None]),
+                },
+            )
+        except Exception as e:
+            logging.error(
+                "Failed to prefetch archived data",
+                extra={"error": str(e), "trace": traceback.format_exc()},
+            )
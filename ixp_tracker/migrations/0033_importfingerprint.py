@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ixp_tracker", "0032_remove_asn_ixp_tracker_unique_as_number_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("record_type", models.TextField()),
+                ("record_id", models.IntegerField()),
+                ("fingerprint", models.CharField(max_length=64)),
+            ],
+            options={
+                "verbose_name": "Import fingerprint",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("record_type", "record_id"),
+                        name="ixp_tracker_import_fingerprint_record",
+                    )
+                ],
+            },
+        ),
+    ]
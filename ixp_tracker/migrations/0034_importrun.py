@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ixp_tracker", "0033_importfingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("processing_date", models.DateTimeField(db_index=True)),
+                (
+                    "stage",
+                    models.IntegerField(
+                        choices=[
+                            (0, "Started"),
+                            (1, "IXPs"),
+                            (2, "ASNs"),
+                            (3, "Members"),
+                            (4, "Finished"),
+                        ],
+                        default=0,
+                    ),
+                ),
+                ("counts", models.JSONField(default=dict)),
+                ("last_ixp", models.IntegerField(null=True)),
+                ("started", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("finished", models.DateTimeField(null=True)),
+            ],
+            options={
+                "verbose_name": "Import run",
+            },
+        ),
+    ]
@@ -168,3 +168,47 @@ class UpdatedIXPs(models.Model):
                 name="ixp_tracker_last_updated_ixps",
             )
         ]
+
+
+class ImportFingerprint(models.Model):
+    record_type = models.TextField(blank=False)
+    record_id = models.IntegerField()
+    fingerprint = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.record_type} {self.record_id}: {self.fingerprint}"
+
+    class Meta:
+        verbose_name = "Import fingerprint"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["record_type", "record_id"],
+                name="ixp_tracker_import_fingerprint_record",
+            )
+        ]
+
+
+class ImportRun(models.Model):
+    class Stage(models.IntegerChoices):
+        STARTED = 0
+        IXPS = 1, "IXPs"
+        ASNS = 2, "ASNs"
+        MEMBERS = 3
+        FINISHED = 4
+
+    processing_date = models.DateTimeField(db_index=True)
+    stage = models.IntegerField(choices=Stage.choices, default=Stage.STARTED)
+    counts = models.JSONField(default=dict)
+    last_ixp = models.IntegerField(
+        null=True
+    )  # The PeeringDB id of the last IXP whose members were imported
+    started = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    finished = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.processing_date} - {self.Stage(self.stage).label}"
+
+    class Meta:
+        verbose_name = "Import run"
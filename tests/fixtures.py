@@ -48,6 +48,9 @@ from ixp_tracker.models import (
 )
 from ixp_tracker.json import IXPJSONEncoder, stringify_date
 
+# The date used by the tests that run whole imports
+processing_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+
 
 class MemberProperties(TypedDict):
     last_active: NotRequired[datetime]
@@ -132,6 +135,28 @@ class PeeringNetIXLANFactory(factory.DictFactory):
         )
 
 
+def build_pdb_data(ixps: int | list[dict] = 1, asns: int | list[dict] = 1) -> dict:
+    """
+    Builds the PeeringDB data for an import, with every ASN a member of every IXP. Pass a number instead of a list to
+    create that many IXPs (with PeeringDB ids from 0) or ASNs (numbered from 1).
+    """
+    if isinstance(ixps, int):
+        ixps = [PeeringIXFactory(id=peeringdb_id) for peeringdb_id in range(ixps)]
+    if isinstance(asns, int):
+        asns = [PeeringASNFactory(asn=asn) for asn in range(1, asns + 1)]
+    return {
+        "ix": {"data": ixps},
+        "net": {"data": asns},
+        "netixlan": {
+            "data": [
+                PeeringNetIXLANFactory(asn=asn["asn"], ix_id=ixp["id"])
+                for ixp in ixps
+                for asn in asns
+            ]
+        },
+    }
+
+
 class MockLookup(AdditionalDataSources):
     def __init__(
         self,
@@ -0,0 +1,70 @@
+import gzip
+import json
+import lzma
+from datetime import datetime, timezone
+
+import pytest
+from django.core.management import call_command
+
+from ixp_tracker.archive import (
+    compress_archive_file,
+    find_archive_file,
+    get_archive_file_name,
+    list_archive_files,
+)
+from ixp_tracker.importers import get_archived_data
+
+from .fixtures import PeeringIXFactory
+
+pytestmark = pytest.mark.django_db
+backfill_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+example_pdb_data = {
+    "ix": {"data": [PeeringIXFactory()]},
+    "net": {"data": []},
+    "netixlan": {"data": []},
+}
+
+
+@pytest.mark.parametrize(
+    "open_file,compression", [(gzip.open, "gzip"), (lzma.open, "xz")]
+)
+def test_reads_compressed_archive_files(tmp_path, open_file, compression):
+    file_name = get_archive_file_name(tmp_path, backfill_date, compression)
+    with open_file(file_name, "wt", encoding="utf-8") as f:
+        json.dump(example_pdb_data, f)
+
+    archived_data = get_archived_data(backfill_date, tmp_path)
+
+    assert len(archived_data.get("ix").get("data")) == 1
+
+
+def test_converts_archive_file_compression(tmp_path):
+    file_name = get_archive_file_name(tmp_path, backfill_date)
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(example_pdb_data, f)
+
+    converted_file_name = compress_archive_file(file_name, "xz")
+
+    assert converted_file_name.name == "20240101.peeringdb_2_dump.json.xz"
+    assert not file_name.exists()
+    assert find_archive_file(tmp_path, backfill_date) == converted_file_name
+    with lzma.open(converted_file_name, "rt", encoding="utf-8") as f:
+        assert json.load(f) == example_pdb_data
+
+
+def test_command_converts_whole_archive_directory(tmp_path):
+    for day in [1, 2, 3]:
+        file_name = get_archive_file_name(tmp_path, backfill_date.replace(day=day))
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(example_pdb_data, f)
+    (tmp_path / "unrelated.txt").write_text("Not an archive file")
+
+    call_command("ixp_tracker_compress_archive", compression="gzip", path=tmp_path)
+
+    archive_files = list_archive_files(tmp_path)
+    assert [f.name for _, f in archive_files] == [
+        "20240101.peeringdb_2_dump.json.gz",
+        "20240102.peeringdb_2_dump.json.gz",
+        "20240103.peeringdb_2_dump.json.gz",
+    ]
+    assert (tmp_path / "unrelated.txt").exists()
@@ -1,10 +1,15 @@
+import threading
 from datetime import datetime, timezone
 
 import pytest
 from faker import Faker
 
+from ixp_tracker import importers
+from ixp_tracker.event_store import EventSequenceConflict
 from ixp_tracker.importers import process_asn_data
+from ixp_tracker.ixp_tracker import IXPTracker
 from ixp_tracker.ixp_tracker_aggregates import NetworkType, PeeringPolicy, NROStatus
+from ixp_tracker.models import StoredEvent
 
 from .fixtures import PeeringASNFactory, build_app, MockLookup
 
@@ -126,3 +131,77 @@ def test_uses_registration_country_at_processing_date():
     asns = app.get_all_asns()
     asn_added = asns[0]
     assert asn_added.country_code == "US"
+
+
+def test_runs_lookups_concurrently_and_imports_in_order(monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_LOOKUP_MAX_WORKERS", 4)
+    data_to_import = [PeeringASNFactory() for _ in range(10)]
+    app, _ = build_app()
+
+    process_asn_data(data_to_import, processing_date, MockLookup(), app)
+
+    created_asns = (
+        StoredEvent.objects.filter(event_type="ASNCreated")
+        .order_by("pk")
+        .values_list("data__as_number", flat=True)
+    )
+    assert list(created_asns) == [asn_data["asn"] for asn_data in data_to_import]
+
+
+def test_closes_db_connections_opened_by_lookup_workers(monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_LOOKUP_MAX_WORKERS", 4)
+    closed_by = []
+    monkeypatch.setattr(
+        importers.connections,
+        "close_all",
+        lambda: closed_by.append(threading.current_thread()),
+    )
+    app, _ = build_app()
+
+    process_asn_data(
+        [PeeringASNFactory() for _ in range(3)], processing_date, MockLookup(), app
+    )
+
+    assert len(closed_by) == 3
+    assert threading.main_thread() not in closed_by
+
+
+def test_skips_asn_if_lookups_fail(monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_LOOKUP_MAX_WORKERS", 4)
+    failing_asn = PeeringASNFactory()
+
+    class FailingLookup(MockLookup):
+        def get_status(self, asn: int, as_at: datetime) -> str:
+            if asn == failing_asn["asn"]:
+                raise RuntimeError("Lookup failed")
+            return self.default_status
+
+    app, _ = build_app()
+
+    process_asn_data(
+        [failing_asn, PeeringASNFactory()], processing_date, FailingLookup(), app
+    )
+
+    asns = app.get_all_asns()
+    assert len(asns) == 1
+    assert asns[0].number != failing_asn["asn"]
+
+
+def test_reimports_asn_after_sequence_conflict(monkeypatch):
+    import_asn = IXPTracker.import_asn
+    calls = []
+
+    def import_asn_with_conflict(self, *args):
+        calls.append(args[0])
+        if len(calls) == 1:
+            raise EventSequenceConflict("Conflict")
+        return import_asn(self, *args)
+
+    monkeypatch.setattr(IXPTracker, "import_asn", import_asn_with_conflict)
+    asn_data = PeeringASNFactory()
+    app, _ = build_app()
+
+    process_asn_data([asn_data], processing_date, MockLookup(), app)
+
+    assert calls == [asn_data["asn"], asn_data["asn"]]
+    assert len(app.get_all_asns()) == 1
@@ -0,0 +1,72 @@
+import json
+import threading
+from datetime import datetime, timezone
+
+import pytest
+import responses
+from django.core.management import call_command
+
+from ixp_tracker import importers
+from ixp_tracker.conf import DATA_ARCHIVE_URL
+from ixp_tracker.importers import build_app, get_archived_months
+from ixp_tracker.models import StatsPerIXP
+from tests.fixtures import PeeringIXFactory
+
+pytestmark = pytest.mark.django_db
+months = [
+    datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc),
+    datetime(year=2024, month=2, day=1).replace(tzinfo=timezone.utc),
+]
+
+
+def test_yields_each_month_in_order(monkeypatch):
+    monkeypatch.setattr(
+        importers, "get_archived_data", lambda month, path: {"month": month.month}
+    )
+
+    archived_months = list(get_archived_months(months, None))
+
+    assert archived_months == [
+        (months[0], {"month": 1}),
+        (months[1], {"month": 2}),
+    ]
+
+
+def test_gets_next_month_while_current_month_is_imported(monkeypatch):
+    next_month_started = threading.Event()
+
+    def get_archived_data(month, path):
+        if month == months[1]:
+            next_month_started.set()
+        return {}
+
+    monkeypatch.setattr(importers, "get_archived_data", get_archived_data)
+
+    archived_months = get_archived_months(months, None)
+    next(archived_months)
+
+    assert next_month_started.wait(timeout=5)
+    assert next(archived_months) == (months[1], {})
+
+
+def test_command_imports_range_of_months():
+    ix_data = PeeringIXFactory()
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        for month in months:
+            rsps.get(
+                url=DATA_ARCHIVE_URL.format(
+                    year=month.year, month=month.month, day=month.day
+                ),
+                body=json.dumps(
+                    {
+                        "ix": {"data": [ix_data]},
+                        "net": {"data": []},
+                        "netixlan": {"data": []},
+                    }
+                ),
+            )
+
+        call_command("ixp_tracker_import", backfill_from="202401", backfill_to="202402")
+
+    assert len(build_app().get_all_ixps()) == 1
+    assert StatsPerIXP.objects.filter(stats_date=months[1].date()).count() == 1
@@ -0,0 +1,126 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import responses
+
+from ixp_tracker import importers
+from ixp_tracker.caida import CATALOG_FILE_NAME, CaidaCatalog
+from ixp_tracker.conf import DATA_ARCHIVE_DIRECTORY_URL, DATA_ARCHIVE_URL
+from ixp_tracker.http import build_session
+from ixp_tracker.importers import get_archived_data
+
+pytestmark = pytest.mark.django_db
+backfill_date = datetime(year=2024, month=1, day=10).replace(tzinfo=timezone.utc)
+example_pdb_data = {
+    "ix": {"data": [{"id": 1}]},
+    "net": {"data": []},
+    "netixlan": {"data": []},
+}
+
+
+def directory_listing(dates: list[datetime]) -> str:
+    links = [
+        f'<a href="peeringdb_2_dump_{d.year}_{d.month:02d}_{d.day:02d}.json">dump</a>'
+        for d in dates
+    ]
+    return "<html><body>" + "\n".join(links) + "</body></html>"
+
+
+def directory_url(month_date: datetime) -> str:
+    return DATA_ARCHIVE_DIRECTORY_URL.format(
+        year=month_date.year, month=month_date.month
+    )
+
+
+def dump_url(dump_date: datetime) -> str:
+    return DATA_ARCHIVE_URL.format(
+        year=dump_date.year, month=dump_date.month, day=dump_date.day
+    )
+
+
+def test_goes_straight_to_latest_dump_in_listing(tmp_path):
+    dump_date = backfill_date - timedelta(days=4)
+    with responses.RequestsMock() as rsps:
+        rsps.get(directory_url(backfill_date), body=directory_listing([dump_date]))
+        rsps.get(dump_url(dump_date), body=json.dumps(example_pdb_data))
+
+        archived_data = get_archived_data(backfill_date, tmp_path)
+
+    assert archived_data["ix"]["data"] == [{"id": 1}]
+
+
+def test_looks_in_previous_month_listing(tmp_path):
+    dump_date = datetime(year=2023, month=12, day=30).replace(tzinfo=timezone.utc)
+    with responses.RequestsMock() as rsps:
+        rsps.get(directory_url(backfill_date), body=directory_listing([]))
+        rsps.get(directory_url(dump_date), body=directory_listing([dump_date]))
+        rsps.get(dump_url(dump_date), body=json.dumps(example_pdb_data))
+
+        archived_data = get_archived_data(backfill_date, None)
+
+    assert archived_data["ix"]["data"] == [{"id": 1}]
+
+
+def test_keeps_dumps_in_http_cache_without_local_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_HTTP_CACHE_PATH", str(tmp_path))
+    dump_date = backfill_date - timedelta(days=4)
+    with responses.RequestsMock() as rsps:
+        rsps.get(directory_url(backfill_date), body=directory_listing([dump_date]))
+        rsps.get(dump_url(dump_date), body=json.dumps(example_pdb_data))
+
+        get_archived_data(backfill_date, None)
+    with responses.RequestsMock():
+        archived_data = get_archived_data(backfill_date, None)
+
+    assert archived_data["ix"]["data"] == [{"id": 1}]
+    assert (tmp_path / importers.CAIDA_CACHE_DIR).is_dir()
+
+
+def test_treats_missing_directory_as_no_dumps(tmp_path):
+    with responses.RequestsMock() as rsps:
+        rsps.get(directory_url(backfill_date), status=404)
+        rsps.get(
+            directory_url(backfill_date - timedelta(days=15)),
+            status=404,
+        )
+
+        archived_data = get_archived_data(backfill_date, tmp_path)
+
+    assert archived_data is None
+
+
+def test_saves_catalog_in_local_archive(tmp_path):
+    with responses.RequestsMock() as rsps:
+        listing = rsps.get(
+            directory_url(backfill_date), body=directory_listing([backfill_date])
+        )
+        CaidaCatalog(tmp_path, build_session()).has_dump(backfill_date)
+        catalog = CaidaCatalog(tmp_path, build_session())
+
+        assert catalog.has_dump(backfill_date) is True
+        assert catalog.has_dump(backfill_date - timedelta(days=1)) is False
+        assert listing.call_count == 1
+    assert (tmp_path / CATALOG_FILE_NAME).exists()
+
+
+def test_lists_month_again_for_days_after_listing(tmp_path):
+    today = datetime.now(timezone.utc)
+    with responses.RequestsMock() as rsps:
+        listing = rsps.get(directory_url(today), body=directory_listing([]))
+        catalog = CaidaCatalog(tmp_path, build_session())
+
+        catalog.has_dump(today)
+        catalog.has_dump(today)
+
+        assert listing.call_count == 2
+
+
+def test_does_not_know_about_month_if_listing_fails(tmp_path):
+    with responses.RequestsMock() as rsps:
+        listing = rsps.get(directory_url(backfill_date), status=403)
+        catalog = CaidaCatalog(tmp_path, build_session())
+
+        assert catalog.has_dump(backfill_date) is None
+        assert catalog.has_dump(backfill_date - timedelta(days=1)) is None
+        assert listing.call_count == 1
@@ -169,3 +169,28 @@ def test_returns_true_with_one_network_active_and_one_not():
     ix_checks = check_org_networks(ixs, networks, ASNBasedASNGeoLookup(), test_date)
 
     assert ix_checks == {ixp["id"]: True}
+
+
+def test_only_looks_up_each_network_once_per_date():
+    ixp = PeeringIXFactory()
+    same_org_ixp = PeeringIXFactory(org_id=ixp["org_id"])
+    networks = [
+        PeeringASNFactory(org_id=ixp["org_id"]),
+        PeeringASNFactory(org_id=ixp["org_id"]),
+    ]
+
+    class CountingLookup(MockLookup):
+        def __init__(self):
+            super().__init__(default_country="ZZ", default_status="available")
+            self.lookups: list[tuple[int, datetime]] = []
+
+        def get_status(self, asn: int, as_at: datetime) -> str:
+            self.lookups.append((asn, as_at))
+            return super().get_status(asn, as_at)
+
+    lookup = CountingLookup()
+    ix_checks = check_org_networks([ixp, same_org_ixp], networks, lookup, test_date)
+
+    assert ix_checks == {ixp["id"]: False, same_org_ixp["id"]: False}
+    assert len(lookup.lookups) == 4
+    assert len(set(lookup.lookups)) == 4
@@ -50,3 +50,27 @@ def test_speed_for_deduped_members_is_sum_of_all_speeds():
 
     deduplicated_member = deduplicated_data[0]
     assert deduplicated_member["speed"] == 4500
+
+
+def test_does_not_modify_raw_member_data():
+    member_import = PeeringNetIXLANFactory(speed=500, is_rs_peer=False)
+    duplicate = PeeringNetIXLANFactory(
+        ix_id=member_import["ix_id"],
+        asn=member_import["asn"],
+        speed=1000,
+        is_rs_peer=True,
+    )
+
+    dedupe_member_data([member_import, duplicate])
+
+    assert member_import["speed"] == 500
+    assert not member_import["is_rs_peer"]
+
+
+def test_passes_through_members_without_duplicates():
+    member_import = PeeringNetIXLANFactory()
+    other_member = PeeringNetIXLANFactory(ix_id=member_import["ix_id"])
+
+    deduplicated_data = dedupe_member_data([member_import, other_member])
+
+    assert deduplicated_data == [member_import, other_member]
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+
+from ixp_tracker import gather_data
+from ixp_tracker.archive import (
+    apply_delta,
+    diff_archive_data,
+    find_archive_file,
+    get_archive_file_name,
+    is_delta_file,
+)
+from ixp_tracker.gather_data import save_data
+from ixp_tracker.importers import get_archived_data
+
+pytestmark = pytest.mark.django_db
+base_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+base_data = {
+    "ix": {"data": [{"id": 1, "name": "IX 1"}, {"id": 2, "name": "IX 2"}]},
+    "net": {"data": [{"id": 10, "asn": 65001}, {"id": 11, "asn": 65002}]},
+    "netixlan": {"data": [{"id": 20, "asn": 65001, "ix_id": 1}]},
+}
+changed_data = {
+    "ix": {"data": [{"id": 1, "name": "IX 1 renamed"}, {"id": 2, "name": "IX 2"}]},
+    "net": {"data": [{"id": 10, "asn": 65001}, {"id": 12, "asn": 65003}]},
+    "netixlan": {"data": [{"id": 20, "asn": 65001, "ix_id": 1}]},
+    "poc": {"data": [{"name": "No id"}]},
+}
+
+
+@pytest.fixture
+def delta_interval(monkeypatch):
+    monkeypatch.setattr(gather_data, "IXP_TRACKER_LOCAL_DATA_ARCHIVE_DELTA_INTERVAL", 7)
+
+
+def test_only_keeps_changes_against_base():
+    delta = diff_archive_data(base_data, changed_data, base_date)
+
+    assert delta == {
+        "base": "20240101",
+        "collections": {
+            "ix": {"upserts": [{"id": 1, "name": "IX 1 renamed"}], "deletes": []},
+            "net": {"upserts": [{"id": 12, "asn": 65003}], "deletes": [11]},
+            "netixlan": {"upserts": [], "deletes": []},
+            "poc": {"data": [{"name": "No id"}]},
+        },
+    }
+
+
+def test_rebuilds_data_from_base_and_delta():
+    delta = diff_archive_data(base_data, changed_data, base_date)
+
+    assert apply_delta(base_data, delta) == changed_data
+
+
+def test_saves_delta_against_recent_full_dump(tmp_path, delta_interval):
+    delta_date = base_date + timedelta(days=3)
+
+    save_data(base_data, base_date, tmp_path)
+    save_data(changed_data, delta_date, tmp_path)
+
+    assert not is_delta_file(find_archive_file(tmp_path, base_date))
+    assert find_archive_file(tmp_path, delta_date) == get_archive_file_name(
+        tmp_path, delta_date, delta=True
+    )
+    archived_data = get_archived_data(delta_date, tmp_path)
+    assert archived_data["ix"] == changed_data["ix"]
+    assert archived_data["net"]["data"] == [
+        {"id": 10, "asn": 65001},
+        {"id": 12, "asn": 65003},
+    ]
+
+
+def test_saves_full_dump_once_interval_has_passed(tmp_path, delta_interval):
+    full_date = base_date + timedelta(days=7)
+
+    save_data(base_data, base_date, tmp_path)
+    save_data(changed_data, base_date + timedelta(days=1), tmp_path)
+    save_data(changed_data, full_date, tmp_path)
+
+    assert not is_delta_file(find_archive_file(tmp_path, full_date))
+
+
+def test_cannot_read_delta_without_base(tmp_path, delta_interval):
+    delta_date = base_date + timedelta(days=1)
+    save_data(base_data, base_date, tmp_path)
+    save_data(changed_data, delta_date, tmp_path)
+    find_archive_file(tmp_path, base_date).unlink()
+
+    assert get_archived_data(delta_date, tmp_path) is None
+
+
+def test_compressing_archive_keeps_deltas(tmp_path, delta_interval):
+    delta_date = base_date + timedelta(days=1)
+    save_data(base_data, base_date, tmp_path)
+    save_data(changed_data, delta_date, tmp_path)
+
+    call_command("ixp_tracker_compress_archive", compression="xz", path=tmp_path)
+
+    assert find_archive_file(tmp_path, delta_date) == get_archive_file_name(
+        tmp_path, delta_date, "xz", delta=True
+    )
+    assert get_archived_data(delta_date, tmp_path)["ix"] == changed_data["ix"]
+
+
+def test_rereads_delta_if_base_is_replaced(tmp_path, delta_interval):
+    delta_date = base_date + timedelta(days=1)
+    save_data(base_data, base_date, tmp_path)
+    save_data(changed_data, delta_date, tmp_path)
+    get_archived_data(delta_date, tmp_path)
+    replaced_ix = {"id": 2, "name": "IX 2 replaced"}
+    save_data(
+        {**base_data, "ix": {"data": [base_data["ix"]["data"][0], replaced_ix]}},
+        base_date,
+        tmp_path,
+    )
+
+    archived_data = get_archived_data(delta_date, tmp_path)
+
+    assert archived_data["ix"]["data"] == [
+        {"id": 1, "name": "IX 1 renamed"},
+        replaced_ix,
+    ]
@@ -0,0 +1,177 @@
+import gzip
+import io
+from datetime import datetime, timezone
+
+import responses
+from requests import ConnectionError
+
+from ixp_tracker import caida
+from ixp_tracker.archive import get_archive_file_name, get_partial_file_name
+from ixp_tracker.caida import download_dump, get_validator_file_name
+from ixp_tracker.conf import DATA_ARCHIVE_URL
+from ixp_tracker.http import build_session
+
+dump_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+dump_url = DATA_ARCHIVE_URL.format(
+    year=dump_date.year, month=dump_date.month, day=dump_date.day
+)
+dump_content = (
+    b'{"ix": {"data": [{"id": 1}]}, "net": {"data": []}, "netixlan": {"data": []}}'
+)
+dump_etag = '"dump-v1"'
+
+
+def serve_ranges(request):
+    range_header = request.headers.get("Range")
+    if range_header is None or request.headers.get("If-Range") != dump_etag:
+        return 200, {"ETag": dump_etag}, dump_content
+    start = int(range_header.removeprefix("bytes=").removesuffix("-"))
+    return (
+        206,
+        {"Content-Range": f"bytes {start}-{len(dump_content) - 1}/{len(dump_content)}"},
+        dump_content[start:],
+    )
+
+
+class DroppedConnection(io.BufferedReader):
+    """
+    A response body that drops the connection once it has sent the first part of the dump
+    """
+
+    def __init__(self, sent: int):
+        super().__init__(io.BytesIO(dump_content[:sent]))
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise ConnectionError("Connection dropped")
+        return data
+
+
+def test_streams_dump_into_archive(tmp_path):
+    with responses.RequestsMock() as rsps:
+        rsps.get(dump_url, body=dump_content)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file == get_archive_file_name(tmp_path, dump_date)
+    assert archive_file.read_bytes() == dump_content
+    assert not get_partial_file_name(archive_file).exists()
+
+
+def test_resumes_partial_download(tmp_path):
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    partial_file_name.write_bytes(dump_content[:20])
+    get_validator_file_name(partial_file_name).write_text(dump_etag)
+    with responses.RequestsMock() as rsps:
+        download = rsps.add_callback(responses.GET, dump_url, callback=serve_ranges)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+        assert download.call_count == 1
+        assert download.calls[0].request.headers["Range"] == "bytes=20-"
+        assert download.calls[0].request.headers["If-Range"] == dump_etag
+    assert archive_file.read_bytes() == dump_content
+    assert not partial_file_name.exists()
+    assert not get_validator_file_name(partial_file_name).exists()
+
+
+def test_resumes_with_validator_from_first_response(tmp_path, monkeypatch):
+    # Small chunks so we've written part of the dump before the connection drops
+    monkeypatch.setattr(caida, "DOWNLOAD_CHUNK_SIZE", 10)
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    with responses.RequestsMock() as rsps:
+        rsps.get(dump_url, headers={"ETag": dump_etag}, body=DroppedConnection(20))
+        download = rsps.add_callback(responses.GET, dump_url, callback=serve_ranges)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+        assert download.calls[0].request.headers["If-Range"] == dump_etag
+    assert archive_file.read_bytes() == dump_content
+    assert not partial_file_name.exists()
+
+
+def test_starts_again_if_dump_has_changed(tmp_path):
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    partial_file_name.write_bytes(b"an older dump")
+    get_validator_file_name(partial_file_name).write_text('"dump-v0"')
+    with responses.RequestsMock() as rsps:
+        rsps.add_callback(responses.GET, dump_url, callback=serve_ranges)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file.read_bytes() == dump_content
+
+
+def test_does_not_resume_without_validator(tmp_path):
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    partial_file_name.write_bytes(dump_content[:20])
+    with responses.RequestsMock() as rsps:
+        download = rsps.add_callback(responses.GET, dump_url, callback=serve_ranges)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+        assert "Range" not in download.calls[0].request.headers
+    assert archive_file.read_bytes() == dump_content
+
+
+def test_starts_again_if_server_ignores_range(tmp_path):
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    partial_file_name.write_bytes(b"something else")
+    with responses.RequestsMock() as rsps:
+        rsps.get(dump_url, body=dump_content)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file.read_bytes() == dump_content
+
+
+def test_discards_download_of_wrong_size(tmp_path):
+    partial_file_name = get_partial_file_name(
+        get_archive_file_name(tmp_path, dump_date)
+    )
+    partial_file_name.write_bytes(dump_content[:20])
+    with responses.RequestsMock() as rsps:
+        rsps.get(
+            dump_url,
+            status=206,
+            headers={"Content-Range": f"bytes 20-29/{len(dump_content) + 10}"},
+            body=dump_content[20:30],
+        )
+        rsps.get(dump_url, body=dump_content)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file.read_bytes() == dump_content
+
+
+def test_compresses_dump_if_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr(caida, "IXP_TRACKER_LOCAL_DATA_ARCHIVE_COMPRESSION", "gzip")
+    with responses.RequestsMock() as rsps:
+        rsps.get(dump_url, body=dump_content)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file == get_archive_file_name(tmp_path, dump_date, "gzip")
+    with gzip.open(archive_file, "rb") as f:
+        assert f.read() == dump_content
+
+
+def test_returns_nothing_if_dump_not_found(tmp_path):
+    with responses.RequestsMock() as rsps:
+        rsps.get(dump_url, status=404)
+
+        archive_file = download_dump(dump_date, tmp_path, build_session())
+
+    assert archive_file is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,110 @@
+import json
+from io import StringIO
+from uuid import uuid4
+
+import pytest
+import responses
+from django.core.management import call_command
+
+from ixp_tracker import importers
+from ixp_tracker.conf import DATA_ARCHIVE_URL
+from ixp_tracker.event_store import DjangoEventStore, EventStore, InMemoryEventStore
+from ixp_tracker.importers import import_pdb_data
+from ixp_tracker.models import ImportFingerprint, IXPIdMap, StoredEvent
+from tests.fixtures import (
+    TEST_EVENT_MAP,
+    CreatedTestAggregate,
+    MockLookup,
+    TestAggregate,
+    TestAggregateUpdated,
+    build_pdb_data,
+    processing_date,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def run_dry_run(pdb_data: dict) -> str:
+    out = StringIO()
+    with responses.RequestsMock() as rsps:
+        rsps.get(
+            url=DATA_ARCHIVE_URL.format(
+                year=processing_date.year,
+                month=processing_date.month,
+                day=processing_date.day,
+            ),
+            body=json.dumps(pdb_data),
+        )
+        call_command("ixp_tracker_import", backfill="202401", dry_run=True, stdout=out)
+    return out.getvalue()
+
+
+def test_loads_events_from_db():
+    es = EventStore(TEST_EVENT_MAP, DjangoEventStore())
+    aggregate = es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+    es.store(aggregate, TestAggregateUpdated(foo="baz"))
+    es.save_snapshot(aggregate)
+
+    in_memory_es = EventStore(TEST_EVENT_MAP, InMemoryEventStore.from_db())
+    loaded = in_memory_es.get_aggregate(aggregate.id, TestAggregate)
+
+    assert loaded.foo == "baz"
+    assert loaded.sequence == 2
+
+
+def test_does_not_save_new_events():
+    persistence = InMemoryEventStore.from_db()
+    es = EventStore(TEST_EVENT_MAP, persistence)
+
+    aggregate = es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+    es.store(aggregate, TestAggregateUpdated(foo="baz"))
+
+    assert StoredEvent.objects.count() == 0
+    assert [e.event_sequence for e in persistence.new_events] == [1, 2]
+    assert es.get_aggregate(aggregate.id, TestAggregate).foo == "baz"
+
+
+def test_dry_run_reports_events_without_saving_anything():
+    output = run_dry_run(build_pdb_data())
+
+    assert StoredEvent.objects.count() == 0
+    assert IXPIdMap.objects.count() == 0
+    assert ImportFingerprint.objects.count() == 0
+    assert "IXP: 1 aggregates" in output
+    assert "  IXPCreated: 1" in output
+    assert "  IXPMemberJoined: 1" in output
+    assert "  ASNCreated: 1" in output
+
+
+def test_dry_run_can_repeat_import():
+    pdb_data = build_pdb_data()
+    import_pdb_data(pdb_data, MockLookup(), processing_date)
+    event_count = StoredEvent.objects.count()
+
+    output = run_dry_run(pdb_data)
+
+    assert StoredEvent.objects.count() == event_count
+    assert "IXPCreated" not in output
+    assert "  IXPActiveInPeeringDb: 1" in output
+
+
+def test_dry_run_does_not_add_to_local_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_LOCAL_DATA_ARCHIVE_PATH", tmp_path)
+
+    output = run_dry_run(build_pdb_data())
+
+    assert "  IXPCreated: 1" in output
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dry_run_does_not_save_live_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(importers, "gather_data", lambda **kwargs: build_pdb_data())
+    monkeypatch.setattr(importers, "IXP_TRACKER_PEERING_DB_STREAM_TO_ARCHIVE", True)
+    saved = []
+    monkeypatch.setattr(importers, "save_data", lambda *args: saved.append(args))
+
+    live_data = importers.get_live_data(processing_date, tmp_path, dry_run=True)
+
+    assert len(live_data["ix"]["data"]) == 1
+    assert saved == []
+    assert list(tmp_path.iterdir()) == []
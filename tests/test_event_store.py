@@ -5,6 +5,8 @@ import pytest
 
 from uuid import uuid4
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 from ixp_tracker.event_store import (
@@ -14,6 +16,7 @@ from ixp_tracker.event_store import (
     EventStore,
     DomainEvent,
     EventNotMapped,
+    EventSequenceConflict,
 )
 from ixp_tracker.models import CannotChangeStoredEvent, StoredEvent
 from tests.fixtures import (
@@ -98,6 +101,43 @@ def test_saves_aggregate_sequence():
     assert stored_event.event_sequence == 2
 
 
+def test_appends_batch_of_events_with_consecutive_sequences():
+    des = DjangoEventStore()
+    es = EventStore(TEST_EVENT_MAP, des)
+    aggregate = es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+
+    aggregate = es.append(
+        aggregate,
+        [TestAggregateUpdated(foo="baz"), TestAggregateUpdated(foo="qux")],
+        aggregate.sequence,
+    )
+
+    assert [e.event_sequence for e in des.get_events()] == [1, 2, 3]
+    assert aggregate.sequence == 3
+    assert aggregate.foo == "qux"
+
+
+def test_raises_if_another_writer_has_changed_aggregate():
+    des = DjangoEventStore()
+    es = EventStore(TEST_EVENT_MAP, des)
+    aggregate = es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+    other_es = EventStore(TEST_EVENT_MAP, DjangoEventStore())
+    other_es.store(
+        other_es.get_aggregate(aggregate.id, TestAggregate),
+        TestAggregateUpdated(foo="baz"),
+    )
+
+    with pytest.raises(EventSequenceConflict):
+        es.store(aggregate, TestAggregateUpdated(foo="qux"))
+
+    assert [e.event_sequence for e in des.get_events()] == [1, 2]
+    reloaded = es.store(
+        es.get_aggregate(aggregate.id, TestAggregate), TestAggregateUpdated(foo="qux")
+    )
+    assert reloaded.sequence == 3
+    assert es.get_aggregate(aggregate.id, TestAggregate).foo == "qux"
+
+
 def test_saved_events_cannot_be_changed():
     des = DjangoEventStore()
     es = EventStore(TEST_EVENT_MAP, des)
@@ -257,3 +297,16 @@ def test_retrieves_past_state_of_aggregate_using_sequence(faker: Faker):
     aggregate_in_past = es.get_aggregate(aggregate.id, TestAggregate, version=1)
 
     assert aggregate_in_past.foo == "bar"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stores_single_event_in_one_query_outside_transaction():
+    es = EventStore(TEST_EVENT_MAP, DjangoEventStore())
+    aggregate = es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+
+    with CaptureQueriesContext(connection) as queries:
+        es.store(aggregate, TestAggregateUpdated(foo="baz"))
+
+    assert len(queries) == 1
+    with pytest.raises(EventSequenceConflict):
+        es.store(TestAggregate(id=aggregate.id), TestAggregateUpdated(foo="qux"))
@@ -1,7 +1,10 @@
+import json
+
 import responses
+from responses import matchers
 
 from django_test_app.settings import IXP_TRACKER_PEERING_DB_URL
-from ixp_tracker.gather_data import gather_data
+from ixp_tracker.gather_data import IMPORT_FIELDS, PEERING_DB_ENDPOINTS, gather_data
 
 
 def test_gathers_all_data_types():
@@ -69,3 +72,37 @@ def test_gathers_all_data_types():
         assert len(all_data["org"]["data"]) > 0
         # Check we only get 1 POC as we need to filter on "visible: Public"
         assert len(all_data["poc"]["data"]) == 1
+
+
+def test_gathers_endpoints_concurrently_in_endpoint_order():
+    with responses.RequestsMock() as rsps:
+        for endpoint in PEERING_DB_ENDPOINTS:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body=json.dumps(
+                    {"data": [{"endpoint": endpoint, "visible": "Public"}]}
+                ),
+            )
+
+        all_data = gather_data(max_workers=4)
+
+        for endpoint in PEERING_DB_ENDPOINTS:
+            assert all_data[endpoint]["data"] == [
+                {"endpoint": endpoint, "visible": "Public"}
+            ]
+        assert len(rsps.calls) == len(PEERING_DB_ENDPOINTS)
+
+
+def test_import_profile_only_gathers_fields_used_by_importer():
+    with responses.RequestsMock() as rsps:
+        for endpoint, fields in IMPORT_FIELDS.items():
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body='{"data":[{"foo":"bar"}]}',
+                match=[matchers.query_param_matcher({"fields": ",".join(fields)})],
+            )
+
+        all_data = gather_data(profile="import")
+
+        assert len(rsps.calls) == len(IMPORT_FIELDS)
+    assert list(all_data.keys()) == ["ix", "net", "netixlan"]
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timezone
+
+import responses
+from responses import matchers
+
+from django_test_app.settings import IXP_TRACKER_PEERING_DB_URL
+from ixp_tracker.gather_data import (
+    PEERING_DB_ENDPOINTS,
+    gather_data,
+    load_latest_data,
+    merge_changes,
+    save_data,
+)
+
+previous_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+
+
+def test_merges_changed_records_into_previous_data():
+    previous = [{"id": 1, "name": "one"}, {"id": 2, "name": "two"}]
+    changes = [
+        {"id": 2, "name": "two updated", "status": "ok"},
+        {"id": 3, "name": "three", "status": "ok"},
+    ]
+
+    merged = merge_changes(previous, changes)
+
+    assert merged == [
+        {"id": 1, "name": "one"},
+        {"id": 2, "name": "two updated", "status": "ok"},
+        {"id": 3, "name": "three", "status": "ok"},
+    ]
+
+
+def test_removes_deleted_records():
+    previous = [{"id": 1, "name": "one"}, {"id": 2, "name": "two"}]
+    changes = [{"id": 1, "name": "one", "status": "deleted"}]
+
+    merged = merge_changes(previous, changes)
+
+    assert merged == [{"id": 2, "name": "two"}]
+
+
+def test_only_requests_changes_since_previous_dump():
+    previous_data = {
+        endpoint: {"data": [{"id": 1, "visible": "Public"}]}
+        for endpoint in PEERING_DB_ENDPOINTS
+    }
+    with responses.RequestsMock() as rsps:
+        for endpoint in PEERING_DB_ENDPOINTS:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body=json.dumps({"data": [{"id": 2, "visible": "Public"}]}),
+                match=[
+                    matchers.query_param_matcher(
+                        {"since": int(previous_date.timestamp())}
+                    )
+                ],
+            )
+
+        all_data = gather_data(previous_data=previous_data, since=previous_date)
+
+    for endpoint in PEERING_DB_ENDPOINTS:
+        assert [r["id"] for r in all_data[endpoint]["data"]] == [1, 2]
+
+
+def test_downloads_collections_missing_from_previous_data_in_full():
+    previous_data = {"ix": {"data": [{"id": 1}]}}
+    with responses.RequestsMock() as rsps:
+        for endpoint in PEERING_DB_ENDPOINTS:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body=json.dumps({"data": [{"id": 2, "visible": "Public"}]}),
+            )
+
+        all_data = gather_data(previous_data=previous_data, since=previous_date)
+
+        full_downloads = [c for c in rsps.calls if "since" not in c.request.url]
+        assert len(full_downloads) == len(PEERING_DB_ENDPOINTS) - 1
+    assert [r["id"] for r in all_data["ix"]["data"]] == [1, 2]
+    assert [r["id"] for r in all_data["net"]["data"]] == [2]
+
+
+def test_loads_latest_dump_on_or_before_processing_date(tmp_path):
+    save_data({"ix": {"data": [{"id": 1}]}}, previous_date, tmp_path)
+    save_data({"ix": {"data": [{"id": 2}]}}, previous_date.replace(day=10), tmp_path)
+
+    previous_data, dump_date = load_latest_data(tmp_path, previous_date.replace(day=5))
+
+    assert dump_date == previous_date
+    assert previous_data["ix"]["data"] == [{"id": 1}]
+
+
+def test_returns_nothing_if_no_previous_dump(tmp_path):
+    previous_data, dump_date = load_latest_data(tmp_path, previous_date)
+
+    assert previous_data is None
+    assert dump_date is None
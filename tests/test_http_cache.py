@@ -0,0 +1,110 @@
+import gzip
+import os
+import time
+
+import responses
+from requests import Session
+from responses import matchers
+
+from ixp_tracker.http import CachingAdapter, HttpCache
+
+url = "https://publicdata.caida.org/datasets/peeringdb/2024/01/peeringdb_2_dump_2024_01_01.json"
+
+
+def build_caching_session(cache_path) -> Session:
+    session = Session()
+    session.mount("https://", CachingAdapter(HttpCache(cache_path)))
+    return session
+
+
+def test_serves_not_modified_responses_from_cache(tmp_path):
+    session = build_caching_session(tmp_path)
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, body='{"ix": {"data": []}}', headers={"ETag": '"abc"'})
+        rsps.get(
+            url,
+            status=304,
+            match=[matchers.header_matcher({"If-None-Match": '"abc"'})],
+        )
+
+        first = session.get(url)
+        second = session.get(url)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == {"ix": {"data": []}}
+
+
+def test_sends_if_modified_since_for_cached_responses(tmp_path):
+    last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+    session = build_caching_session(tmp_path)
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, body="first", headers={"Last-Modified": last_modified})
+        changed = rsps.get(
+            url,
+            body="second",
+            match=[matchers.header_matcher({"If-Modified-Since": last_modified})],
+        )
+
+        session.get(url)
+        response = session.get(url)
+
+        assert changed.call_count == 1
+    assert response.text == "second"
+
+
+def test_does_not_cache_responses_without_validators(tmp_path):
+    session = build_caching_session(tmp_path)
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, body="first")
+
+        session.get(url)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_does_not_cache_streamed_responses(tmp_path):
+    session = build_caching_session(tmp_path)
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, body="first", headers={"ETag": '"abc"'})
+
+        session.get(url, stream=True)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_does_not_keep_content_encoding_for_decoded_body(tmp_path):
+    session = build_caching_session(tmp_path)
+    with responses.RequestsMock() as rsps:
+        rsps.get(
+            url,
+            body=gzip.compress(b'{"ix": {"data": []}}'),
+            headers={"ETag": '"abc"', "Content-Encoding": "gzip"},
+        )
+        rsps.get(url, status=304)
+
+        session.get(url)
+        cached = session.get(url)
+
+    assert "Content-Encoding" not in cached.headers
+    assert cached.json() == {"ix": {"data": []}}
+
+
+def test_prunes_entries_that_have_not_been_used(tmp_path):
+    session = build_caching_session(tmp_path)
+    other_url = f"{url}?since=1704067200"
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, body="first", headers={"ETag": '"abc"'})
+        rsps.get(other_url, body="second", headers={"ETag": '"def"'})
+
+        session.get(url)
+        session.get(other_url)
+    a_week_ago = time.time() - (7 * 24 * 60 * 60)
+    for cache_file in HttpCache(tmp_path).get_file_names(other_url):
+        os.utime(cache_file, (a_week_ago, a_week_ago))
+
+    cache = HttpCache(tmp_path, max_age=24 * 60 * 60)
+
+    assert cache.load(url)[0] is not None
+    assert cache.load(other_url) == (None, None)
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from ixp_tracker import importers
+from ixp_tracker.importers import process_asn_data, process_ixp_data
+from ixp_tracker.models import ImportFingerprint, StoredEvent
+from tests.fixtures import MockLookup, PeeringASNFactory, PeeringIXFactory, build_app
+
+pytestmark = pytest.mark.django_db
+first_import = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+second_import = datetime(year=2024, month=2, day=1).replace(tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def skip_unchanged_records(monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_SKIP_UNCHANGED_RECORDS", True)
+
+
+def get_event_types(since: int) -> list[str]:
+    return list(
+        StoredEvent.objects.filter(pk__gt=since)
+        .order_by("pk")
+        .values_list("event_type", flat=True)
+    )
+
+
+def get_last_event_id() -> int:
+    last_event = StoredEvent.objects.order_by("-pk").first()
+    return last_event.pk if last_event else 0
+
+
+def test_only_marks_unchanged_ixp_as_active():
+    ixp_data = PeeringIXFactory()
+    app, _ = build_app()
+    process_ixp_data([ixp_data], first_import, MockLookup(), app, {})
+    last_event_id = get_last_event_id()
+
+    process_ixp_data([ixp_data], second_import, MockLookup(), app, {})
+
+    assert get_event_types(last_event_id) == ["IXPActiveInPeeringDb"]
+    ixp = app.get_all_ixps().pop()
+    assert ixp.last_active == second_import
+    assert ixp.name == ixp_data["name"]
+
+
+def test_listeners_get_full_ixp_when_marked_active():
+    ixp_data = PeeringIXFactory()
+    app, es = build_app()
+    process_ixp_data([ixp_data], first_import, MockLookup(), app, {})
+    handled = []
+
+    class ActiveListener:
+        def handle(self, event, aggregate):
+            handled.append((event.event_type, aggregate.name, aggregate.sequence))
+
+    es.add_listener(ActiveListener())
+    process_ixp_data([ixp_data], second_import, MockLookup(), app, {})
+
+    assert handled == [("IXPActiveInPeeringDb", ixp_data["name"], 2)]
+
+
+def test_imports_changed_ixp_in_full():
+    ixp_data = PeeringIXFactory()
+    app, _ = build_app()
+    process_ixp_data([ixp_data], first_import, MockLookup(), app, {})
+    last_event_id = get_last_event_id()
+
+    process_ixp_data(
+        [{**ixp_data, "name": "New name"}], second_import, MockLookup(), app, {}
+    )
+
+    assert get_event_types(last_event_id) == ["IXPUpdated", "IXPActiveInPeeringDb"]
+    assert app.get_all_ixps().pop().name == "New name"
+
+
+def test_imports_ixp_in_full_if_lookups_change():
+    ixp_data = PeeringIXFactory()
+    app, _ = build_app()
+    process_ixp_data([ixp_data], first_import, MockLookup(), app, {})
+    last_event_id = get_last_event_id()
+
+    process_ixp_data(
+        [ixp_data],
+        second_import,
+        MockLookup(manrs_participants=[ixp_data["id"]]),
+        app,
+        {},
+    )
+
+    assert get_event_types(last_event_id) == [
+        "ManrsStatusChange",
+        "IXPActiveInPeeringDb",
+    ]
+
+
+def test_skips_unchanged_asn():
+    asn_data = PeeringASNFactory()
+    app, _ = build_app()
+    process_asn_data([asn_data], first_import, MockLookup(), app)
+    last_event_id = get_last_event_id()
+
+    process_asn_data([asn_data], second_import, MockLookup(), app)
+    process_asn_data(
+        [{**asn_data, "name": "New name"}], second_import, MockLookup(), app
+    )
+
+    assert get_event_types(last_event_id) == ["ASNUpdated"]
+
+
+def test_does_not_store_fingerprints_if_disabled(monkeypatch):
+    monkeypatch.setattr(importers, "IXP_TRACKER_SKIP_UNCHANGED_RECORDS", False)
+    ixp_data = PeeringIXFactory()
+    app, _ = build_app()
+    process_ixp_data([ixp_data], first_import, MockLookup(), app, {})
+    process_asn_data([PeeringASNFactory()], first_import, MockLookup(), app)
+
+    assert ImportFingerprint.objects.count() == 0
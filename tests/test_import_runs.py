@@ -0,0 +1,143 @@
+from uuid import uuid4
+
+import pytest
+
+from ixp_tracker import importers
+from ixp_tracker.event_store import DataAlreadyImported, DjangoEventStore, EventStore
+from ixp_tracker.import_runs import ImportCheckpoints
+from ixp_tracker.importers import build_app, import_pdb_data
+from ixp_tracker.ixp_tracker import IXPTracker
+from ixp_tracker.models import ImportRun
+from tests.fixtures import (
+    TEST_EVENT_MAP,
+    CreatedTestAggregate,
+    MockLookup,
+    TestAggregate,
+    build_pdb_data,
+    processing_date,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_records_finished_run():
+    import_pdb_data(build_pdb_data(), MockLookup(), processing_date)
+
+    run = ImportRun.objects.get()
+    assert run.processing_date == processing_date
+    assert run.stage == ImportRun.Stage.FINISHED
+    assert run.finished is not None
+    assert run.counts == {"IXPs": 1, "ASNs": 1, "Members": 1}
+
+
+def test_cannot_repeat_finished_run():
+    pdb_data = build_pdb_data()
+    import_pdb_data(pdb_data, MockLookup(), processing_date)
+
+    with pytest.raises(DataAlreadyImported):
+        import_pdb_data(pdb_data, MockLookup(), processing_date)
+
+
+def test_resumes_from_last_completed_stage(monkeypatch):
+    pdb_data = build_pdb_data()
+    process_asn_data = importers.process_asn_data
+
+    def fail(*args):
+        raise RuntimeError("Import failed")
+
+    monkeypatch.setattr(importers, "process_asn_data", fail)
+    with pytest.raises(RuntimeError):
+        import_pdb_data(pdb_data, MockLookup(), processing_date)
+    assert ImportRun.objects.get().stage == ImportRun.Stage.IXPS
+
+    monkeypatch.setattr(importers, "process_asn_data", process_asn_data)
+    monkeypatch.setattr(importers, "process_ixp_data", fail)
+    import_pdb_data(pdb_data, MockLookup(), processing_date)
+
+    run = ImportRun.objects.get()
+    assert run.stage == ImportRun.Stage.FINISHED
+    ixps = build_app().get_all_ixps()
+    assert len(ixps) == 1
+    assert len(ixps[0].get_members()) == 1
+
+
+class ImportKilled(BaseException):
+    pass
+
+
+def test_resumes_members_after_last_completed_ixp(monkeypatch):
+    monkeypatch.setattr(ImportCheckpoints, "ixp_interval", 1)
+    pdb_data = build_pdb_data(4)
+    import_members = IXPTracker.import_members
+    imported = []
+
+    def killed_after_second_ixp(self, ixp, ixp_data, processing_date):
+        if len(imported) == 2:
+            raise ImportKilled
+        imported.append(ixp.peeringdb_id)
+        return import_members(self, ixp, ixp_data, processing_date)
+
+    monkeypatch.setattr(IXPTracker, "import_members", killed_after_second_ixp)
+    with pytest.raises(ImportKilled):
+        import_pdb_data(pdb_data, MockLookup(), processing_date)
+    assert ImportRun.objects.get().last_ixp == 1
+    resumed = []
+
+    def record_ixps(self, ixp, ixp_data, processing_date):
+        resumed.append(ixp.peeringdb_id)
+        return import_members(self, ixp, ixp_data, processing_date)
+
+    monkeypatch.setattr(IXPTracker, "import_members", record_ixps)
+
+    import_pdb_data(pdb_data, MockLookup(), processing_date)
+
+    assert resumed == [2, 3]
+    assert ImportRun.objects.get().stage == ImportRun.Stage.FINISHED
+    assert all(len(ixp.get_members()) == 1 for ixp in build_app().get_all_ixps())
+
+
+def test_only_records_checkpoint_every_few_ixps(monkeypatch):
+    monkeypatch.setattr(ImportCheckpoints, "ixp_interval", 2)
+    checkpoints = []
+    complete_ixp = ImportCheckpoints.complete_ixp
+
+    def record_checkpoint(self, peeringdb_id):
+        checkpoints.append(peeringdb_id)
+        return complete_ixp(self, peeringdb_id)
+
+    monkeypatch.setattr(ImportCheckpoints, "complete_ixp", record_checkpoint)
+
+    import_pdb_data(build_pdb_data(5), MockLookup(), processing_date)
+
+    assert checkpoints == [1, 3]
+    assert ImportRun.objects.get().stage == ImportRun.Stage.FINISHED
+
+
+def test_leaves_run_open_if_members_skipped():
+    pdb_data = build_pdb_data()
+    import_pdb_data(pdb_data, MockLookup(), processing_date, import_members=False)
+
+    run = ImportRun.objects.get()
+    assert run.stage == ImportRun.Stage.ASNS
+    assert run.finished is None
+
+    import_pdb_data(pdb_data, MockLookup(), processing_date)
+
+    assert ImportRun.objects.get().stage == ImportRun.Stage.FINISHED
+    assert len(build_app().get_all_ixps()[0].get_members()) == 1
+
+
+def test_checks_events_if_ledger_is_empty():
+    es = EventStore(TEST_EVENT_MAP, DjangoEventStore())
+    es.time_travel(processing_date)
+    es.store(TestAggregate(id=uuid4()), CreatedTestAggregate(foo="bar"))
+
+    assert DjangoEventStore().has_existing_data(processing_date)
+    assert not DjangoEventStore().has_existing_data(processing_date.replace(month=2))
+
+
+def test_checks_ledger_for_existing_data():
+    ImportRun.objects.create(processing_date=processing_date)
+
+    assert DjangoEventStore().has_existing_data(processing_date)
+    assert not DjangoEventStore().has_existing_data(processing_date.replace(month=2))
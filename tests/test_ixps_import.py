@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 import pytest
 
 from ixp_tracker.importers import process_ixp_data
+from ixp_tracker.ixp_tracker import IXPTracker
 from tests.fixtures import MockLookup, PeeringIXFactory, build_app
 
 pytestmark = pytest.mark.django_db
@@ -125,3 +126,32 @@ def test_saves_anchor_host():
 
     ixp = app.find_by_peeringdb_id(new_data["id"])
     assert ixp.anchor_host
+
+
+def test_reimports_ixp_if_changed_by_another_writer(monkeypatch):
+    ix_data = PeeringIXFactory()
+    app, _ = build_app()
+    first_import = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+    process_ixp_data([ix_data], first_import, MockLookup(), app, {})
+    update_ixp = IXPTracker._update_ixp
+    calls = []
+
+    def update_ixp_after_other_writer(self, ixp, *args):
+        if len(calls) == 0:
+            other_app, _ = build_app()
+            other_app.mark_ixp_active(ixp.id, first_import)
+        calls.append(ixp.sequence)
+        return update_ixp(self, ixp, *args)
+
+    monkeypatch.setattr(IXPTracker, "_update_ixp", update_ixp_after_other_writer)
+
+    process_ixp_data(
+        [{**ix_data, "name": "New name"}],
+        first_import.replace(month=2),
+        MockLookup(),
+        app,
+        {},
+    )
+
+    assert calls == [1, 2]
+    assert app.get_all_ixps()[0].name == "New name"
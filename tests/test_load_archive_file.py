@@ -0,0 +1,211 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from ixp_tracker import archive
+from ixp_tracker import json as ixp_tracker_json
+from ixp_tracker.archive import (
+    NORMALIZED_CACHE_DIR,
+    StreamingArchiveReader,
+    get_archive_file_name,
+    load_archive_file,
+    load_normalized_archive_file,
+)
+
+archive_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+example_dump = {
+    "as_set": {"data": [{"id": 1, "name": "AS-{EXAMPLE}", "note": 'a "quoted" ]'}]},
+    "ix": {"data": [{"id": 1, "name": "Some IX", "org": {"id": 2, "tags": [1, 2.5]}}]},
+    "fac": {"data": [{"id": 3, "notes": '{[\\"}'}], "meta": {"generated": 1.5}},
+    "net": {"data": [{"id": 4, "asn": 65001, "info_prefixes4": 1234567890}]},
+    "netixlan": {"meta": {}, "data": [{"id": 5, "asn": 65001, "speed": 10000}]},
+    "poc": {"data": []},
+}
+
+
+@pytest.fixture(autouse=True, params=["json", "orjson"])
+def json_codec(request, monkeypatch):
+    monkeypatch.setattr(ixp_tracker_json, "IXP_TRACKER_JSON_CODEC", request.param)
+    return request.param
+
+
+def write_dump(tmp_path, content: str):
+    file_name = get_archive_file_name(tmp_path, archive_date)
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write(content)
+    return file_name
+
+
+def test_only_keeps_requested_collections(tmp_path):
+    file_name = write_dump(tmp_path, json.dumps(example_dump, indent=4))
+
+    all_data = load_archive_file(file_name, ["ix", "net", "netixlan"])
+
+    assert all_data == {
+        "ix": example_dump["ix"],
+        "net": example_dump["net"],
+        "netixlan": {"data": example_dump["netixlan"]["data"]},
+    }
+
+
+def test_loads_everything_if_no_collections_requested(tmp_path):
+    file_name = write_dump(tmp_path, json.dumps(example_dump))
+
+    all_data = load_archive_file(file_name)
+
+    assert all_data["fac"]["data"] == example_dump["fac"]["data"]
+    assert len(all_data) == len(example_dump)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_handles_values_split_across_chunks(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(StreamingArchiveReader, "chunk_size", chunk_size)
+    file_name = write_dump(tmp_path, json.dumps(example_dump, indent=2))
+
+    all_data = load_archive_file(file_name, ["ix", "net", "netixlan"])
+
+    assert all_data["ix"] == example_dump["ix"]
+    assert all_data["net"] == example_dump["net"]
+    assert all_data["netixlan"]["data"] == example_dump["netixlan"]["data"]
+
+
+def test_reads_compressed_dump(tmp_path):
+    file_name = get_archive_file_name(tmp_path, archive_date, "gzip")
+    with gzip.open(file_name, "wt", encoding="utf-8") as f:
+        json.dump(example_dump, f)
+
+    all_data = load_archive_file(file_name, ["net"])
+
+    assert all_data == {"net": example_dump["net"]}
+
+
+def test_falls_back_for_single_quoted_dump(tmp_path):
+    file_name = write_dump(
+        tmp_path, "{'ix': {'data': [{'id': 1}]}, 'fac': {'data': [{'id': 2}]}}"
+    )
+
+    all_data = load_archive_file(file_name, ["ix", "net"])
+
+    assert all_data == {"ix": {"data": [{"id": 1}]}}
+
+
+def test_handles_empty_dump(tmp_path):
+    file_name = write_dump(tmp_path, "{}")
+
+    all_data = load_archive_file(file_name, ["ix"])
+
+    assert all_data == {}
+
+
+def test_normalized_copy_only_keeps_requested_fields(tmp_path):
+    file_name = write_dump(tmp_path, json.dumps(example_dump))
+
+    all_data = load_normalized_archive_file(
+        file_name, {"ix": ["id", "name"], "net": None}
+    )
+
+    assert all_data == {
+        "ix": {"data": [{"id": 1, "name": "Some IX"}]},
+        "net": example_dump["net"],
+    }
+    assert len(list((tmp_path / NORMALIZED_CACHE_DIR).iterdir())) == 1
+
+
+def test_uses_normalized_copy_once_created(tmp_path, monkeypatch):
+    file_name = write_dump(tmp_path, "{'ix': {'data': [{'id': 1, 'name': 'Some IX'}]}}")
+    load_normalized_archive_file(file_name, {"ix": ["id"]})
+
+    def fail_to_parse(*args):
+        raise AssertionError("Should not parse the dump again")
+
+    monkeypatch.setattr(archive, "load_archive_file", fail_to_parse)
+    all_data = load_normalized_archive_file(file_name, {"ix": ["id"]})
+
+    assert all_data == {"ix": {"data": [{"id": 1}]}}
+
+
+def test_ignores_normalized_copy_if_dump_or_fields_change(tmp_path):
+    file_name = write_dump(tmp_path, json.dumps({"ix": {"data": [{"id": 1}]}}))
+    load_normalized_archive_file(file_name, {"ix": ["id"]})
+    write_dump(tmp_path, json.dumps({"ix": {"data": [{"id": 2, "name": "New IX"}]}}))
+
+    assert load_normalized_archive_file(file_name, {"ix": ["id"]}) == {
+        "ix": {"data": [{"id": 2}]}
+    }
+    assert load_normalized_archive_file(file_name, {"ix": ["id", "name"]}) == {
+        "ix": {"data": [{"id": 2, "name": "New IX"}]}
+    }
+
+
+def test_removes_normalized_copies_of_dumps_that_have_gone(tmp_path):
+    old_file_name = write_dump(tmp_path, json.dumps({"ix": {"data": [{"id": 1}]}}))
+    load_normalized_archive_file(old_file_name, {"ix": ["id"]})
+    old_file_name.unlink()
+    file_name = get_archive_file_name(
+        tmp_path, datetime(2024, 1, 2, tzinfo=timezone.utc)
+    )
+    file_name.write_text(json.dumps({"ix": {"data": [{"id": 2}]}}))
+
+    load_normalized_archive_file(file_name, {"ix": ["id"]})
+
+    normalized_files = list((tmp_path / NORMALIZED_CACHE_DIR).iterdir())
+    assert len(normalized_files) == 1
+    assert normalized_files[0].name.startswith(file_name.name)
+
+
+def test_keeps_normalized_copies_for_each_set_of_fields(tmp_path):
+    file_name = write_dump(tmp_path, json.dumps({"ix": {"data": [{"id": 1}]}}))
+
+    load_normalized_archive_file(file_name, {"ix": ["id"]})
+    load_normalized_archive_file(file_name, {"ix": ["id", "name"]})
+
+    assert len(list((tmp_path / NORMALIZED_CACHE_DIR).iterdir())) == 2
+
+
+def test_complains_if_codec_not_installed(tmp_path, monkeypatch):
+    monkeypatch.setattr(ixp_tracker_json, "IXP_TRACKER_JSON_CODEC", "orjson")
+    monkeypatch.setattr(ixp_tracker_json, "orjson", None)
+    file_name = write_dump(tmp_path, json.dumps(example_dump))
+
+    with pytest.raises(ImproperlyConfigured):
+        load_archive_file(file_name)
+
+
+def test_falls_back_to_standard_library_if_codec_not_installed(monkeypatch):
+    monkeypatch.setattr(ixp_tracker_json, "IXP_TRACKER_JSON_CODEC", "auto")
+    monkeypatch.setattr(ixp_tracker_json, "orjson", None)
+
+    assert ixp_tracker_json.get_json_codec() == "json"
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_streams_dump_whatever_the_codec(tmp_path, monkeypatch, compression):
+    file_name = get_archive_file_name(tmp_path, archive_date, compression)
+    with archive.open_compressed_file(file_name, "wt", compression) as f:
+        json.dump(example_dump, f)
+
+    def fail_to_decode(*args):
+        raise AssertionError("Should not decode the whole dump")
+
+    monkeypatch.setattr(archive, "decode_json", fail_to_decode)
+    all_data = load_archive_file(file_name, ["net"])
+
+    assert all_data == {"net": example_dump["net"]}
+    if compression is not None:
+        assert load_archive_file(file_name)["ix"] == example_dump["ix"]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+def test_handles_numbers_split_across_chunks(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(StreamingArchiveReader, "chunk_size", chunk_size)
+    numbers = [1.5, 2e3, -0.25, 10, 3.75e-2, 123456.5]
+    file_name = write_dump(tmp_path, json.dumps({"ix": {"data": numbers}}))
+
+    # We read with the streaming reader directly as load_archive_file would hide a bad split behind its fallback
+    with open(file_name) as f:
+        all_data = StreamingArchiveReader(f).read(["ix"])
+
+    assert all_data["ix"]["data"] == numbers
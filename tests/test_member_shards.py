@@ -0,0 +1,85 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from ixp_tracker.event_store import DataAlreadyImported
+from ixp_tracker.importers import MemberShard, build_app, import_pdb_data
+from ixp_tracker.ixp_tracker import IXPTracker
+from tests.fixtures import (
+    MockLookup,
+    build_pdb_data,
+    processing_date,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def get_members() -> dict[int, list[int]]:
+    return {
+        ixp.peeringdb_id: sorted(ixp.get_members().keys())
+        for ixp in build_app().get_all_ixps()
+    }
+
+
+def test_every_ixp_is_in_exactly_one_shard():
+    shards = [MemberShard(index, 4) for index in range(1, 5)]
+
+    for peeringdb_id in range(100):
+        assert len([s for s in shards if s.includes(peeringdb_id)]) == 1
+
+
+def test_rejects_invalid_shard():
+    with pytest.raises(ValueError):
+        MemberShard(5, 4)
+
+
+def test_imports_members_in_shards():
+    pdb_data = build_pdb_data(10, asns=5)
+
+    import_pdb_data(pdb_data, MockLookup(), processing_date, import_members=False)
+    assert all(members == [] for members in get_members().values())
+    for index in range(1, 4):
+        import_pdb_data(
+            pdb_data, MockLookup(), processing_date, shard=MemberShard(index, 3)
+        )
+
+    assert get_members() == {
+        peeringdb_id: [1, 2, 3, 4, 5] for peeringdb_id in range(10)
+    }
+
+
+def test_cannot_import_shard_before_latest_import():
+    pdb_data = build_pdb_data(2, asns=5)
+    import_pdb_data(pdb_data, MockLookup(), processing_date, import_members=False)
+    import_pdb_data(pdb_data, MockLookup(), processing_date.replace(month=2))
+
+    with pytest.raises(DataAlreadyImported):
+        import_pdb_data(
+            pdb_data, MockLookup(), processing_date, shard=MemberShard(1, 2)
+        )
+
+
+def test_only_checks_ixps_in_shard_are_inactive(monkeypatch):
+    pdb_data = build_pdb_data(10, asns=5)
+    import_pdb_data(pdb_data, MockLookup(), processing_date, import_members=False)
+    checked = []
+
+    def check_ixp_inactive(self, ixp, processing_date):
+        checked.append(ixp.peeringdb_id)
+        return ixp
+
+    monkeypatch.setattr(IXPTracker, "check_ixp_inactive", check_ixp_inactive)
+    shard = MemberShard(1, 3)
+
+    import_pdb_data(
+        {**pdb_data, "netixlan": {"data": []}},
+        MockLookup(),
+        processing_date,
+        shard=shard,
+    )
+
+    assert sorted(checked) == [i for i in range(10) if shard.includes(i)]
+
+
+def test_command_rejects_invalid_shard():
+    with pytest.raises(CommandError):
+        call_command("ixp_tracker_import", "--shard", "5/4")
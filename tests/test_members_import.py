@@ -4,6 +4,7 @@ import pytest
 
 from ixp_tracker.event_store import DjangoEventStore
 from ixp_tracker.importers import process_member_data
+from ixp_tracker.ixp_tracker import IXPTracker
 from ixp_tracker.ixp_tracker_aggregates import IXP
 from tests.fixtures import (
     PeeringNetIXLANFactory,
@@ -119,3 +120,32 @@ def test_marks_members_left_if_ixp_not_referenced_in_import(faker):
     all_members = ixp.get_members(True)
     assert len(all_members) == 3
     assert ixp.active_status is False
+
+
+def test_reloads_ixp_if_changed_by_another_writer(faker, monkeypatch):
+    app, es = build_app()
+    app.time_travel(date_now)
+    ixp = create_ixp(faker, es)
+    asn = create_asn(faker, es)
+    import_members = IXPTracker.import_members
+    calls = []
+
+    def import_members_after_other_writer(self, ixp, ixp_data, processing_date):
+        if len(calls) == 0:
+            other_app, _ = build_app()
+            other_app.mark_ixp_active(ixp.id, date_now)
+        calls.append(ixp.sequence)
+        return import_members(self, ixp, ixp_data, processing_date)
+
+    monkeypatch.setattr(IXPTracker, "import_members", import_members_after_other_writer)
+
+    process_member_data(
+        [PeeringNetIXLANFactory(asn=asn.number, ix_id=ixp.peeringdb_id)],
+        date_now,
+        MockLookup(),
+        app,
+    )
+
+    assert calls == [ixp.sequence, ixp.sequence + 1]
+    ixp = es.get_aggregate(ixp.id, IXP)
+    assert len(ixp.get_members()) == 1
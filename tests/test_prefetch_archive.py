@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+import responses
+from django.core.management import call_command
+
+from ixp_tracker.archive import find_archive_file, get_archive_file_name
+from ixp_tracker.conf import DATA_ARCHIVE_DIRECTORY_URL, DATA_ARCHIVE_URL
+from ixp_tracker.importers import get_months
+
+pytestmark = pytest.mark.django_db
+example_pdb_data = {
+    "ix": {"data": [{"id": 1}]},
+    "net": {"data": []},
+    "netixlan": {"data": []},
+}
+
+
+def month_date(year: int, month: int, day: int = 1) -> datetime:
+    return datetime(year=year, month=month, day=day).replace(tzinfo=timezone.utc)
+
+
+def add_caida_month(rsps, dump_date: datetime):
+    rsps.get(
+        DATA_ARCHIVE_DIRECTORY_URL.format(year=dump_date.year, month=dump_date.month),
+        body=f'<a href="peeringdb_2_dump_{dump_date.year}_{dump_date.month:02d}_{dump_date.day:02d}.json">dump</a>',
+    )
+    return rsps.get(
+        DATA_ARCHIVE_URL.format(
+            year=dump_date.year, month=dump_date.month, day=dump_date.day
+        ),
+        body=json.dumps(example_pdb_data),
+    )
+
+
+def test_gets_first_of_each_month_in_range():
+    months = get_months(month_date(2023, 11, 15), month_date(2024, 2))
+
+    assert months == [
+        month_date(2023, 11),
+        month_date(2023, 12),
+        month_date(2024, 1),
+        month_date(2024, 2),
+    ]
+
+
+def test_downloads_each_month_to_archive(tmp_path):
+    months = [month_date(2024, 1), month_date(2024, 2), month_date(2024, 3)]
+    with responses.RequestsMock() as rsps:
+        for month in months:
+            add_caida_month(rsps, month)
+
+        call_command(
+            "ixp_tracker_prefetch_archive",
+            first_month="202401",
+            last_month="202403",
+            workers=3,
+            path=tmp_path,
+        )
+
+    for month in months:
+        archive_file = find_archive_file(tmp_path, month)
+        assert archive_file is not None
+        with open(archive_file, encoding="utf-8") as f:
+            assert json.load(f) == example_pdb_data
+
+
+def test_does_not_download_months_already_in_archive(tmp_path):
+    with open(
+        get_archive_file_name(tmp_path, month_date(2024, 1)), "w", encoding="utf-8"
+    ) as f:
+        json.dump(example_pdb_data, f)
+    with responses.RequestsMock() as rsps:
+        dump = add_caida_month(rsps, month_date(2024, 2))
+
+        call_command(
+            "ixp_tracker_prefetch_archive",
+            first_month="202401",
+            last_month="202402",
+            path=tmp_path,
+        )
+
+        assert dump.call_count == 1
+    assert find_archive_file(tmp_path, month_date(2024, 2)) is not None
@@ -0,0 +1,101 @@
+import time
+
+import responses
+from urllib3 import Retry
+
+from ixp_tracker.http import (
+    RateLimiter,
+    build_session,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+
+def test_paces_requests_once_burst_is_used_up():
+    rate_limiter = RateLimiter(rate=10)
+
+    for _ in range(11):
+        rate_limiter.acquire()
+
+    assert rate_limiter.throttled_seconds > 0
+
+
+def test_does_not_pace_requests_without_a_rate():
+    rate_limiter = RateLimiter()
+
+    for _ in range(100):
+        rate_limiter.acquire()
+
+    assert rate_limiter.throttled_seconds == 0
+
+
+def test_waits_for_retry_after_when_throttled():
+    rate_limiter = RateLimiter()
+    rate_limiter.acquire()
+
+    rate_limiter.throttle(0.2)
+    start = time.monotonic()
+    rate_limiter.acquire()
+
+    assert time.monotonic() - start >= 0.2
+    assert rate_limiter.throttled_seconds > 0
+
+
+def test_halves_rate_when_throttled_and_recovers_up_to_max_rate():
+    rate_limiter = RateLimiter(rate=4)
+
+    rate_limiter.throttle()
+    assert rate_limiter.rate == 2
+
+    for _ in range(100):
+        rate_limiter.record_success()
+    assert rate_limiter.rate == 4
+
+
+def test_stops_pacing_once_recovered_without_a_max_rate():
+    rate_limiter = RateLimiter()
+    for _ in range(40):
+        rate_limiter.acquire()
+
+    rate_limiter.throttle()
+    assert rate_limiter.rate == 2
+
+    for _ in range(100):
+        rate_limiter.record_success()
+    assert rate_limiter.rate == 0
+
+
+def test_parses_retry_after_in_seconds_and_as_a_date():
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_session_slows_down_when_server_returns_too_many_requests():
+    url = "https://throttled.example.com/api/net"
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, status=429, headers={"Retry-After": "0"})
+        rsps.get(url, body='{"data": []}')
+
+        response = build_session().get(url)
+
+    assert response.status_code == 200
+    assert get_rate_limiter("throttled.example.com").rate > 0
+
+
+def test_session_throttles_once_for_each_too_many_requests(monkeypatch):
+    monkeypatch.setattr(Retry, "get_backoff_time", lambda self: 0)
+    throttled = []
+    monkeypatch.setattr(
+        RateLimiter, "throttle", lambda self, retry_after=None: throttled.append(1)
+    )
+    url = "https://always-throttled.example.com/api/net"
+    with responses.RequestsMock() as rsps:
+        rsps.get(url, status=429)
+
+        response = build_session().get(url)
+
+    assert response.status_code == 429
+    # The first request and each of the retries
+    assert len(throttled) == 5
@@ -0,0 +1,110 @@
+import pytest
+
+from ixp_tracker.event_store import DataAlreadyImported
+from ixp_tracker.importers import ImportScope, build_app, import_pdb_data
+from ixp_tracker.ixp_tracker import IXPTracker
+from ixp_tracker.models import StoredEvent
+from tests.fixtures import (
+    MockLookup,
+    PeeringIXFactory,
+    build_pdb_data,
+    processing_date,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_only_imports_ixps_in_scope():
+    in_scope = PeeringIXFactory(id=1)
+    out_of_scope = PeeringIXFactory(id=2)
+
+    import_pdb_data(
+        build_pdb_data([in_scope, out_of_scope]),
+        MockLookup(),
+        processing_date,
+        ImportScope(peeringdb_ids={1}),
+    )
+
+    ixps = build_app().get_all_ixps()
+    assert [ixp.peeringdb_id for ixp in ixps] == [1]
+    assert len(ixps[0].get_members()) == 1
+    assert len(build_app().get_all_asns()) == 1
+
+
+def test_scopes_ixps_by_country():
+    in_scope = PeeringIXFactory(id=1, country="FR")
+    out_of_scope = PeeringIXFactory(id=2, country="DE")
+
+    import_pdb_data(
+        build_pdb_data([in_scope, out_of_scope]),
+        MockLookup(),
+        processing_date,
+        ImportScope(countries={"FR"}),
+    )
+
+    assert [ixp.peeringdb_id for ixp in build_app().get_all_ixps()] == [1]
+
+
+def test_can_refresh_date_already_imported():
+    ix_data = PeeringIXFactory(id=1)
+    import_pdb_data(build_pdb_data([ix_data]), MockLookup(), processing_date)
+
+    import_pdb_data(
+        build_pdb_data([{**ix_data, "name": "New name"}]),
+        MockLookup(),
+        processing_date,
+        ImportScope(peeringdb_ids={1}),
+    )
+
+    assert build_app().get_all_ixps()[0].name == "New name"
+
+
+def test_cannot_refresh_date_before_latest_import():
+    ix_data = PeeringIXFactory(id=1)
+    import_pdb_data(build_pdb_data([ix_data]), MockLookup(), processing_date)
+    import_pdb_data(
+        build_pdb_data([ix_data]), MockLookup(), processing_date.replace(month=2)
+    )
+
+    with pytest.raises(DataAlreadyImported):
+        import_pdb_data(
+            build_pdb_data([{**ix_data, "name": "New name"}]),
+            MockLookup(),
+            processing_date,
+            ImportScope(peeringdb_ids={1}),
+        )
+
+
+def test_only_checks_ixps_in_scope_are_inactive(monkeypatch):
+    in_scope = PeeringIXFactory(id=1, country="FR")
+    also_in_scope = PeeringIXFactory(id=2, country="FR")
+    out_of_scope = PeeringIXFactory(id=3, country="DE")
+    import_pdb_data(
+        build_pdb_data([in_scope, also_in_scope, out_of_scope]),
+        MockLookup(),
+        processing_date,
+    )
+    out_of_scope_events = StoredEvent.objects.filter(
+        data__peeringdb_id=out_of_scope["id"]
+    ).count()
+    checked = []
+
+    def check_ixp_inactive(self, ixp, processing_date):
+        checked.append(ixp.peeringdb_id)
+        return ixp
+
+    monkeypatch.setattr(IXPTracker, "check_ixp_inactive", check_ixp_inactive)
+
+    # The second IXP in scope has no members in PeeringDB any more, but should still be checked
+    import_pdb_data(
+        build_pdb_data([in_scope, out_of_scope]),
+        MockLookup(),
+        processing_date.replace(month=2),
+        ImportScope(countries={"FR"}),
+    )
+
+    assert sorted(checked) == [in_scope["id"], also_in_scope["id"]]
+    assert (
+        StoredEvent.objects.filter(data__peeringdb_id=out_of_scope["id"]).count()
+        == out_of_scope_events
+    )
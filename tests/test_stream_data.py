@@ -0,0 +1,98 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import responses
+from responses import matchers
+
+from django_test_app.settings import IXP_TRACKER_PEERING_DB_URL
+from ixp_tracker.archive import load_archive_file
+from ixp_tracker.gather_data import (
+    PEERING_DB_ENDPOINTS,
+    get_data,
+    get_data_pages,
+    stream_data,
+)
+
+processing_date = datetime(year=2024, month=1, day=1).replace(tzinfo=timezone.utc)
+
+
+def test_yields_each_page_in_turn():
+    with responses.RequestsMock() as rsps:
+        for skip, body in [(0, [{"id": 1}, {"id": 2}]), (2, [{"id": 3}]), (4, [])]:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/net",
+                body=json.dumps({"data": body}),
+                match=[matchers.query_param_matcher({"limit": 2, "skip": skip})],
+            )
+
+        pages = list(get_data_pages("/net", 2))
+
+    assert pages == [[{"id": 1}, {"id": 2}], [{"id": 3}], []]
+
+
+def test_streams_all_data_to_compressed_archive(tmp_path):
+    with responses.RequestsMock() as rsps:
+        for endpoint in PEERING_DB_ENDPOINTS:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body=json.dumps(
+                    {
+                        "data": [
+                            {"id": 1, "name": "Line\nbreak", "visible": "Public"},
+                            {"id": 2, "name": "Ünïcode", "visible": "Users"},
+                        ]
+                    }
+                ),
+            )
+
+        archive_file = stream_data(processing_date, tmp_path)
+
+    assert archive_file.name == "20240101.peeringdb_2_dump.json.gz"
+    with gzip.open(archive_file, "rt", encoding="utf-8") as f:
+        all_data = json.load(f)
+    assert list(all_data.keys()) == PEERING_DB_ENDPOINTS
+    assert len(all_data["ix"]["data"]) == 2
+    assert len(all_data["poc"]["data"]) == 1
+    assert list(tmp_path.iterdir()) == [archive_file]
+
+
+def test_only_loads_requested_collections_from_streamed_archive(tmp_path):
+    with responses.RequestsMock() as rsps:
+        for endpoint in PEERING_DB_ENDPOINTS:
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/" + endpoint,
+                body=json.dumps({"data": [{"id": 1, "name": "Line\nbreak"}]}),
+            )
+        archive_file = stream_data(processing_date, tmp_path)
+
+    all_data = load_archive_file(archive_file, ["ix", "netixlan"])
+
+    assert list(all_data.keys()) == ["ix", "netixlan"]
+    assert all_data["ix"]["data"] == [{"id": 1, "name": "Line\nbreak"}]
+
+
+def test_requests_pages_in_windows_and_drops_duplicates():
+    pages = {
+        0: [{"id": 1}, {"id": 2}],
+        2: [{"id": 2}, {"id": 3}],
+        4: [{"id": 4}, {"id": 5}],
+        6: [{"id": 6}],
+        8: [],
+        10: [],
+    }
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        for skip, body in pages.items():
+            rsps.get(
+                url=IXP_TRACKER_PEERING_DB_URL + "/netixlan",
+                body=json.dumps({"data": body}),
+                match=[matchers.query_param_matcher({"limit": 2, "skip": skip})],
+            )
+
+        all_data = get_data("/netixlan", 2, windows=2)
+
+        requested_skips = sorted(
+            int(call.request.params["skip"]) for call in rsps.calls
+        )
+    assert [r["id"] for r in all_data] == [1, 2, 3, 4, 5, 6]
+    assert requested_skips == [0, 2, 4, 6]